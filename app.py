@@ -1,15 +1,24 @@
 """Module holds dash app, urls and views."""
 
+import concurrent.futures
+
 import dash
 import dash_bootstrap_components as dbc
-from dash import Input, Output, ctx, callback
+from dash import ClientsideFunction, Input, Output, Patch, State, ctx
+from dash.exceptions import PreventUpdate
 from plotly import graph_objects as go
 
+import compression
 import data
+import export
+import geometry
 import graphs
 import layout
+import metrics
+import regions
+import resolutions
 import settings
-from flask_caching import Cache
+from caching import figure_cache
 
 config = {'responsive': True}
 app = dash.Dash(
@@ -22,15 +31,17 @@ app = dash.Dash(
 app.layout = layout.DEFAULT_LAYOUT
 server = app.server
 server.secret_key = settings.SECRET_KEY
-
-cache = Cache(
-    app.server,
-    config={
-        # try 'filesystem' if you don't want to setup redis
-        "CACHE_TYPE": "filesystem",
-        "CACHE_DIR": "cache-directory",
-    },
+# renders maps of comparison view concurrently
+render_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=settings.RENDER_WORKERS,
+    thread_name_prefix="render",
 )
+# registered first, so compression runs after all other after_request hooks
+if settings.COMPRESS_RESPONSES:
+    compression.compress_responses(server)
+metrics.instrument(app)
+geometry.serve_assets(server)
+export.serve_exports(server)
 
 
 @app.callback(
@@ -76,6 +87,8 @@ def change_unit(
         Output(component_id="choropleth_2", component_property="figure"),
         Output(component_id="col_choropleth_1", component_property="className"),
         Output(component_id="col_choropleth_2", component_property="className"),
+        Output(component_id="choropleth_1_geometry", component_property="data"),
+        Output(component_id="choropleth_2_geometry", component_property="data"),
     ],
     [
         Input(component_id="scenarios", component_property="active_tab"),
@@ -87,6 +100,11 @@ def change_unit(
         Input(component_id="requirement", component_property="value"),
         Input(component_id="unit", component_property="value"),
         Input(component_id="criteria", component_property="value"),
+        Input(component_id="animate", component_property="value"),
+    ],
+    [
+        State(component_id="choropleth_1_geometry", component_property="data"),
+        State(component_id="choropleth_2_geometry", component_property="data"),
     ],
 )
 def choropleth(  # noqa: PLR0913
@@ -99,118 +117,146 @@ def choropleth(  # noqa: PLR0913
         requirement: str,
         unit: str,
         criteria: list[str],
-) -> tuple[go.Figure, go.Figure, str, str]:
-    """Return choropleth for given user settings."""
+        animate: bool,
+        geometry_1: list[str] | None,
+        geometry_2: list[str] | None,
+) -> tuple[go.Figure | Patch, go.Figure | Patch, str, str, list[str] | None, list[str] | None]:
+    """
+    Return choropleth for given user settings.
+
+    If geometry and layout of a displayed choropleth do not change, only a
+    partial update replacing its values is returned.
+    If animate is set, choropleths hold all years and the year slider is not used.
+    """
+    if animate and ctx.triggered_id == "year":
+        raise PreventUpdate
     if scenarios == "scenario_single":
-        return (
-            graphs.get_choropleth(
-                scenario=scenario,
-                spatial_res=spatial_res,
-                requirement=requirement,
-                year=year,
-                unit=unit,
-                criteria=criteria,
-                min_max=get_min_max(requirement, criteria, scenarios, year, scenario, spatial_res=spatial_res),
-                height=800, scenarios=scenarios, coloraxes=True
-            ),
-            graphs.blank_fig(),
-            "col-11",
-            "col-1",
-        )
-    return (
-     
-        graphs.get_choropleth(
-            scenario=scenario_1,
+        fig, geometry_1 = get_choropleth_update(
+            geometry_1,
+            animate,
+            scenario=scenario,
             spatial_res=spatial_res,
             requirement=requirement,
             year=year,
             unit=unit,
             criteria=criteria,
-            min_max=get_min_max(requirement, criteria, scenarios, year,
-                                scenario_1=scenario_1, scenario_2=scenario_2, spatial_res=spatial_res),
-            height=600, scenarios=scenarios, coloraxes=False, 
-        ),
-        graphs.get_choropleth(
-            scenario=scenario_2,
+            min_max=get_min_max(requirement, criteria, scenarios, scenario, spatial_res=spatial_res),
+            height=800, scenarios=scenarios, coloraxes=True
+        )
+        return (
+            fig,
+            graphs.blank_fig(),
+            "col-11",
+            "col-1",
+            geometry_1,
+            None,
+        )
+    min_max = get_min_max(requirement, criteria, scenarios,
+                          scenario_1=scenario_1, scenario_2=scenario_2, spatial_res=spatial_res)
+    # both maps are rendered concurrently, overlapping pandas and plotly work releasing the GIL
+    futures = [
+        render_pool.submit(
+            get_choropleth_update,
+            displayed_geometry,
+            animate,
+            scenario=map_scenario,
             spatial_res=spatial_res,
             requirement=requirement,
             year=year,
             unit=unit,
             criteria=criteria,
-            min_max=get_min_max(requirement, criteria, scenarios, year,
-                                scenario_1=scenario_1, scenario_2=scenario_2, spatial_res=spatial_res),
-            height=600, scenarios=scenarios, coloraxes=True, 
-        ),
-
+            min_max=min_max,
+            height=600, scenarios=scenarios, coloraxes=coloraxes,
+        )
+        for displayed_geometry, map_scenario, coloraxes in [
+            (geometry_1, scenario_1, False),
+            (geometry_2, scenario_2, True),
+        ]
+    ]
+    (fig_1, geometry_1), (fig_2, geometry_2) = (future.result() for future in futures)
+    return (
+        fig_1,
+        fig_2,
         "col-md-6 col-sm-12",
         "col-md-6 col-sm-12",
+        geometry_1,
+        geometry_2,
     )
 
 
-@callback(
-        Output('textarea-scenario', 'children'),
-        [Input(component_id="scenarios", component_property="active_tab"),
-         Input(component_id="scenario", component_property="value"),
-         Input(component_id="scenario_1", component_property="value"),
-         Input(component_id="scenario_2", component_property="value")]
-)
-def update_output(scenarios: str, scenario: str, scenario_1: str,
-                  scenario_2: str,):
-    if scenarios == "scenario_single":
-        return layout.convert_to_markdown(data.get_scenario_text()[scenario])
-    else:
-        try:
-            return layout.convert_to_markdown(data.get_scenario_text()[scenario_1]+"\n"+data.get_scenario_text()[scenario_2])
-        except KeyError:
-            pass
+def get_choropleth_update(
+    geometry: list[str] | None,
+    animate: bool,  # noqa: FBT001
+    **kwargs,
+) -> tuple[go.Figure | Patch, list[str] | None]:
+    """
+    Return partial update if displayed geometry matches, full choropleth otherwise.
+
+    Animated choropleths are always returned in full and reset the displayed geometry.
+    Scenarios without tables at the selected resolution are explained instead of shown as empty map.
+    """
+    if kwargs["scenario"] not in data.get_resolution_scenarios(kwargs["spatial_res"]):
+        label = resolutions.get_resolution(kwargs["spatial_res"]).label
+        return graphs.blank_fig(f"{kwargs['scenario']} is not available at resolution {label}."), None
+    if animate:
+        kwargs.pop("year")
+        return graphs.get_choropleth_animation(**kwargs), None
+    fig = graphs.get_choropleth(**kwargs, geometry=False)
+    key = graphs.get_geometry_key(fig, kwargs["spatial_res"], kwargs["scenarios"])
+    if key == geometry:
+        return graphs.get_choropleth_patch(fig), key
+    return graphs.get_choropleth(**kwargs), key
 
 
-@callback(
+# pure lookups are done in the browser, see assets/callbacks.js
+app.clientside_callback(
+    ClientsideFunction(namespace="rgi", function_name="updateOutput"),
+    Output(component_id="textarea-scenario", component_property="children"),
+    [
+        Input(component_id="scenarios", component_property="active_tab"),
+        Input(component_id="scenario", component_property="value"),
+        Input(component_id="scenario_1", component_property="value"),
+        Input(component_id="scenario_2", component_property="value"),
+    ],
+    State(component_id="lookups", component_property="data"),
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace="rgi", function_name="syncInput"),
     Output(component_id="scenario_1", component_property="value"),
     Output(component_id="scenario_2", component_property="value"),
     Input(component_id="scenario_1", component_property="value"),
     Input(component_id="scenario_2", component_property="value"),
+    State(component_id="lookups", component_property="data"),
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace="rgi", function_name="updateScenarioOptions"),
+    Output(component_id="scenario", component_property="options"),
+    Output(component_id="scenario_1", component_property="options"),
+    Output(component_id="scenario_2", component_property="options"),
+    Input(component_id="spatial_res", component_property="value"),
+    State(component_id="lookups", component_property="data"),
 )
-def sync_input(sce1, sce2):
-    input_id = ctx.triggered[0]["prop_id"].split(".")[0]
-    if (sce1 == sce2) | ((sce1 == "clever")
-                         & (sce2 == "CLEVER")) | ((sce2 == "clever")
-                                                  & (sce1 == "CLEVER")):
-        if input_id == "scenario_1":
-            sce2 = [x for x in data.get_scenarios() if x != data.get_sce_names()[sce1]]
-            sce2 = data.get_sce_pretty_names()[sce2[0]]
-        else:
-            sce1 = [x for x in data.get_scenarios() if x != data.get_sce_names()[sce2]]
-            sce1 = data.get_sce_pretty_names()[sce1[0]]
-    return sce1, sce2
 
+app.clientside_callback(
+    ClientsideFunction(namespace="rgi", function_name="disableYear"),
+    Output(component_id="year", component_property="disabled"),
+    Input(component_id="animate", component_property="value"),
+)
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="rgi", function_name="updateRegionDd"),
+    Output(component_id="region_dd", component_property="options"),
     Output(component_id="region_dd", component_property="value"),
     [
         Input(component_id="choropleth_1", component_property="clickData"),
         Input(component_id="choropleth_2", component_property="clickData"),
-        Input(component_id="region_dd", component_property="value")
-    ]
+        Input(component_id="region_dd", component_property="value"),
+        Input(component_id="spatial_res", component_property="value"),
+    ],
+    State(component_id="lookups", component_property="data"),
 )
-def update_region_dd(
-        choropleth_feature_1: dict,
-        choropleth_feature_2: dict,
-        region: str):
-    """Update region in drop down menu if region is selected on map."""
-    choropleth_triggered = ctx.triggered_id
-    if (choropleth_triggered == "choropleth_1") & (choropleth_feature_1 is not None):
-        region = data.get_pretty_names()[choropleth_feature_1["points"][0]["location"]]
-        if "," in region:
-            region = "- "+region
-        return region
-    elif (choropleth_triggered == "choropleth_2") & (choropleth_feature_2 is not None):
-        region = data.get_pretty_names()[choropleth_feature_2["points"][0]["location"]]
-        if "," in region:
-            region = "- " + region
-        return region
-    else:
-        return region
 
 
 @app.callback(
@@ -229,6 +275,8 @@ def update_region_dd(
         Input(component_id="unit", component_property="value"),
         Input(component_id="region_dd", component_property="value"),
         Input(component_id="criteria", component_property="value"),
+        Input(component_id="animate", component_property="value"),
+        Input(component_id="spatial_res", component_property="value"),
     ],
 )
 def bar_chart(  # noqa: PLR0913
@@ -243,11 +291,15 @@ def bar_chart(  # noqa: PLR0913
         unit: str,
         region: str,
         criteria: list[str],
+        animate: bool,
+        spatial_res: str,
 ) -> tuple[go.Figure]:
-    """Return bar chart for selected region."""
+    """Return bar chart for selected region, of all years if maps are animated."""
     choropleth_triggered = ctx.triggered_id
     if choropleth_triggered is None:
         return (graphs.blank_fig(),)
+    if animate and choropleth_triggered == "year":
+        raise PreventUpdate
     if (choropleth_triggered in (
             "scenarios",
             "scenario",
@@ -256,28 +308,20 @@ def bar_chart(  # noqa: PLR0913
             "requirement",
             "unit",
             "criteria",
-            "year"
+            "year",
+            "animate",
+            "spatial_res",
     )) & (choropleth_feature_1 is None) & (choropleth_feature_2 is None):
-        if "- " in region:
-            region = region[2:]
-        name = [name for name, v in data.get_pretty_names().items() if v == region][0]
-        region = name
+        region = regions.get_registry(spatial_res).get_code(region)
     elif choropleth_triggered == "region_dd":
-        if "- " in region:
-            region = region[2:]
-        name = [name for name, v in data.get_pretty_names().items() if v == region][0]
-        region = name
+        region = regions.get_registry(spatial_res).get_code(region)
     elif (choropleth_triggered == "choropleth_1") or ((choropleth_triggered == "year") & (choropleth_feature_1 is not None) & (region is None)):
         region = choropleth_feature_1["points"][0]["location"]
     elif (choropleth_triggered == "choropleth_2") or ((choropleth_triggered == "year") & (choropleth_feature_2 is not None) & (region is None)):
         region = choropleth_feature_2["points"][0]["location"]
     else:
         if region is not None:
-            if "- " in region:
-                region = region[2:]
-            name = [name for name, v in data.get_pretty_names().items() if v == region][
-                0]
-            region = name
+            region = regions.get_registry(spatial_res).get_code(region)
         else:
             return (graphs.blank_fig(),)
 
@@ -289,16 +333,20 @@ def bar_chart(  # noqa: PLR0913
         graphs.get_bar_chart(
             scenarios=region_scenarios,
             requirement=requirement,
-            year=year,
+            year=None if animate else year,
             unit=unit,
             criteria=criteria,
             region=region,
+            spatial_res=spatial_res,
         ),
     )
 
 
-# @cache.memoize(timeout=0)
-def get_min_max(req: str, criteria: [str], scenarios: str, year: int, scenario=None,
+@figure_cache.memoize(
+    sets=("criteria",),
+    files=lambda req, spatial_res, **_: [*data.get_resolution_files(req, spatial_res), regions.PRETTY_NAMES_FILENAME],
+)
+def get_min_max(req: str, criteria: [str], scenarios: str, scenario=None,
                 scenario_1=None, scenario_2=None, spatial_res="region"
                 ) -> tuple:
     """Get min and max values for each unit in tuple of pd.DataFrames."""
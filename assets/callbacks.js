@@ -0,0 +1,69 @@
+// Clientside callbacks for pure lookups, fed by the "lookups" store built in layout.py
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    rgi: {
+        // Return id of component which triggered the callback, null on initial call
+        getTriggeredId: function () {
+            const triggered = window.dash_clientside.callback_context.triggered;
+            return triggered && triggered.length ? triggered[0].prop_id.split(".")[0] : null;
+        },
+
+        // Year slider is not used while maps are animated over all years
+        disableYear: function (animate) {
+            return Boolean(animate);
+        },
+
+        // Disable scenarios without tables at selected resolution in all scenario drop downs
+        updateScenarioOptions: function (spatialRes, lookups) {
+            const available = lookups.resolution_scenarios[spatialRes];
+            const options = lookups.scenarios.map(
+                (option) => ({label: option, value: option, disabled: !available.includes(option)}),
+            );
+            return [options, options, options];
+        },
+
+        // Prevent comparing a scenario with itself by switching the other scenario
+        syncInput: function (sce1, sce2, lookups) {
+            if (sce1 !== sce2) {
+                return [sce1, sce2];
+            }
+            if (window.dash_clientside.rgi.getTriggeredId() === "scenario_1") {
+                return [sce1, lookups.scenarios.find((option) => option !== sce1)];
+            }
+            return [lookups.scenarios.find((option) => option !== sce2), sce2];
+        },
+
+        // Show description of selected scenarios
+        updateOutput: function (scenarios, scenario, sce1, sce2, lookups) {
+            const markdown = lookups.scenario_markdown;
+            if (scenarios === "scenario_single") {
+                return markdown[scenario];
+            }
+            if (!(sce1 in markdown) || !(sce2 in markdown)) {
+                return null;
+            }
+            return markdown[sce1] + markdown[sce2];
+        },
+
+        // Update region in drop down menu if region is selected on map, and its options to selected resolution.
+        // Regions not named at a resolution fall back to the first option, the EU.
+        updateRegionDd: function (feature1, feature2, region, spatialRes, lookups) {
+            const noUpdate = window.dash_clientside.no_update;
+            const triggeredId = window.dash_clientside.rgi.getTriggeredId();
+            if (triggeredId === "spatial_res") {
+                const options = lookups.region_options[spatialRes];
+                return [options, options.includes(region) ? region : options[0]];
+            }
+            let feature = null;
+            if (triggeredId === "choropleth_1") {
+                feature = feature1;
+            } else if (triggeredId === "choropleth_2") {
+                feature = feature2;
+            }
+            if (feature === null) {
+                return [noUpdate, region];
+            }
+            const label = lookups.region_labels[spatialRes][feature.points[0].location];
+            return [noUpdate, label === undefined ? noUpdate : label];
+        },
+    },
+});
@@ -0,0 +1,317 @@
+"""Holds benchmarks of data layer, figures and dash callbacks."""
+import dataclasses
+import json
+import logging
+import pathlib
+import platform
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from flask.testing import FlaskClient
+from plotly.io.json import to_json_plotly
+
+import data
+import graphs
+import regions
+import settings
+from caching import figure_cache
+
+REGION = "DE1 0"
+SCENARIO_PAIR = ["CLEVER", 'TYNDP "Global Ambition" (GA)']
+# public endpoints the dash renderer reads callbacks from and requests them at
+DEPENDENCIES_URL = "/_dash-dependencies"
+UPDATE_URL = "/_dash-update-component"
+
+
+@dataclasses.dataclass
+class Case:
+    """Benchmark case calling func with given arguments."""
+
+    name: str
+    func: Callable
+    kwargs: dict
+    setup: Callable = lambda: None
+
+    def run(self) -> object:
+        """Run case after its setup."""
+        self.setup()
+        return self.func(**self.kwargs)
+
+
+def get_callback(client: FlaskClient, dependencies: list[dict], output: str) -> Callable[..., bytes]:
+    """
+    Return function requesting the dash callback of given output like the browser and returning the response body.
+
+    Values of inputs and states are passed by component id, triggered is the id of the changed input if any.
+    """
+    (spec,) = (spec for spec in dependencies if f".{output}." in f".{spec['output']}.")
+
+    def request(triggered: str | None = None, **values: object) -> bytes:
+        body = {
+            "output": spec["output"],
+            "inputs": [{**dependency, "value": values[dependency["id"]]} for dependency in spec["inputs"]],
+            "state": [{**dependency, "value": values[dependency["id"]]} for dependency in spec["state"]],
+            "changedPropIds": [
+                f"{dependency['id']}.{dependency['property']}"
+                for dependency in spec["inputs"]
+                if dependency["id"] == triggered
+            ],
+        }
+        response = client.post(UPDATE_URL, json=body)
+        if response.status_code >= 400:  # noqa: PLR2004
+            msg = f"Callback of {output} failed with status {response.status_code}."
+            raise RuntimeError(msg)
+        return response.get_data()
+
+    return request
+
+
+def clear_caches() -> None:
+    """Clear in-process caches, so each run computes its result."""
+    figure_cache.pop_memory_entries()
+    data._get_min_max.cache_clear()  # noqa: SLF001
+
+
+def get_criteria_sets(requirement: str) -> dict[str, list[str]]:
+    """Return all criteria and the first half of them."""
+    criteria = data.get_criteria(requirement)
+    return {"all": criteria, "half": criteria[: len(criteria) // 2]}
+
+
+def get_cases() -> list[Case]:  # noqa: C901
+    """Return benchmark cases over a matrix of user settings."""
+    import app
+
+    client = app.server.test_client()
+    dependencies = client.get(DEPENDENCIES_URL).get_json()
+    change_unit = get_callback(client, dependencies, "unit.options")
+    choropleth = get_callback(client, dependencies, "choropleth_1.figure")
+    bar_chart = get_callback(client, dependencies, "region.figure")
+
+    years = data.get_years()
+    years = [years[0], years[-1]]
+    cases = [Case("data.get_pretty_names", data.get_pretty_names, {})]
+    for requirement, units in data.requirement_units.items():
+        criteria_sets = get_criteria_sets(requirement)
+        cases.append(
+            Case(
+                f"callback.change_unit[{requirement}]",
+                change_unit,
+                {"triggered": "requirement", "requirement": requirement},
+            ),
+        )
+        for year in years:
+            cases.append(
+                Case(
+                    f"data.prepare_data[{requirement}|{year}]",
+                    data.prepare_data,
+                    {
+                        "scenario": SCENARIO_PAIR[0],
+                        "requirement": requirement,
+                        "year": year,
+                        "criteria": criteria_sets["all"],
+                    },
+                ),
+            )
+        for spatial_res in ["region", "country"]:
+            for criteria_name, criteria in criteria_sets.items():
+                cases.append(
+                    Case(
+                        f"data.get_min_max[{requirement}|{spatial_res}|{criteria_name}]",
+                        data.get_min_max,
+                        {"req": requirement, "criteria": criteria, "spatial_res": spatial_res},
+                        setup=clear_caches,
+                    ),
+                )
+        for year in years:
+            for unit in units[:2]:
+                for criteria_name, criteria in criteria_sets.items():
+                    label = f"{requirement}|{year}|{unit}|{criteria_name}"
+                    for spatial_res in ["region", "country"]:
+                        min_max = app.get_min_max.uncached(
+                            requirement, criteria, "scenario_single", SCENARIO_PAIR[0], spatial_res=spatial_res,
+                        )
+                        cases.append(
+                            Case(
+                                f"graphs.get_choropleth[single|{spatial_res}|{label}]",
+                                graphs.get_choropleth,
+                                {
+                                    "scenario": SCENARIO_PAIR[0],
+                                    "spatial_res": spatial_res,
+                                    "requirement": requirement,
+                                    "year": year,
+                                    "unit": unit,
+                                    "criteria": criteria,
+                                    "min_max": min_max,
+                                    "height": 800,
+                                    "scenarios": "scenario_single",
+                                    "coloraxes": True,
+                                },
+                                setup=clear_caches,
+                            ),
+                        )
+                    min_max = app.get_min_max.uncached(
+                        requirement, criteria, "scenario_comparison",
+                        scenario_1=SCENARIO_PAIR[0], scenario_2=SCENARIO_PAIR[1],
+                    )
+                    cases.append(
+                        Case(
+                            f"graphs.get_choropleth[comparison|region|{label}]",
+                            graphs.get_choropleth,
+                            {
+                                "scenario": SCENARIO_PAIR[1],
+                                "spatial_res": "region",
+                                "requirement": requirement,
+                                "year": year,
+                                "unit": unit,
+                                "criteria": criteria,
+                                "min_max": min_max,
+                                "height": 600,
+                                "scenarios": "scenario_comparison",
+                                "coloraxes": True,
+                            },
+                            setup=clear_caches,
+                        ),
+                    )
+                    for scenarios in ["scenario_single", "scenario_comparison"]:
+                        cases.append(
+                            Case(
+                                f"callback.choropleth[{scenarios}|region|{label}]",
+                                choropleth,
+                                {
+                                    "triggered": "unit",
+                                    "scenarios": scenarios,
+                                    "scenario": SCENARIO_PAIR[0],
+                                    "scenario_1": SCENARIO_PAIR[0],
+                                    "scenario_2": SCENARIO_PAIR[1],
+                                    "year": year,
+                                    "spatial_res": "region",
+                                    "requirement": requirement,
+                                    "unit": unit,
+                                    "criteria": criteria,
+                                    "animate": False,
+                                    "choropleth_1_geometry": None,
+                                    "choropleth_2_geometry": None,
+                                },
+                                setup=clear_caches,
+                            ),
+                        )
+                    cases.append(
+                        Case(
+                            f"graphs.get_bar_chart[{label}]",
+                            graphs.get_bar_chart,
+                            {
+                                "scenarios": SCENARIO_PAIR,
+                                "requirement": requirement,
+                                "year": year,
+                                "unit": unit,
+                                "criteria": criteria,
+                                "region": REGION,
+                            },
+                            setup=clear_caches,
+                        ),
+                    )
+                    cases.append(
+                        Case(
+                            f"callback.bar_chart[{label}]",
+                            bar_chart,
+                            {
+                                "triggered": "region_dd",
+                                "choropleth_1": None,
+                                "choropleth_2": None,
+                                "scenarios": "scenario_comparison",
+                                "scenario": SCENARIO_PAIR[0],
+                                "scenario_1": SCENARIO_PAIR[0],
+                                "scenario_2": SCENARIO_PAIR[1],
+                                "year": year,
+                                "requirement": requirement,
+                                "unit": unit,
+                                "region_dd": regions.get_registry().get_dropdown_label(REGION),
+                                "criteria": criteria,
+                                "animate": False,
+                                "spatial_res": "region",
+                            },
+                            setup=clear_caches,
+                        ),
+                    )
+    return cases
+
+
+def get_payload_size(result: object) -> int | None:
+    """Return size of result serialized to json as sent to the browser, None for data layer results."""
+    if isinstance(result, bytes):
+        return len(result)
+    try:
+        return len(to_json_plotly(result).encode("utf-8"))
+    except TypeError:
+        return None
+
+
+def measure(case: Case, repeat: int) -> dict[str, float]:
+    """Return median and minimum wall time, peak memory and payload size of case."""
+    # first run warms up lazily loaded data which is not part of the measurement
+    result = case.run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "wall_s": statistics.median(times),
+        "wall_min_s": min(times),
+        "peak_bytes": peak,
+        "payload_bytes": get_payload_size(result),
+    }
+
+
+def run(repeat: int = 3, pattern: str | None = None) -> dict:
+    """Run benchmark cases matching pattern and return results with environment info."""
+    figure_cache.disable_disk()
+    results = {}
+    for case in get_cases():
+        if pattern and pattern not in case.name:
+            continue
+        results[case.name] = measure(case, repeat)
+        logging.info(f"{case.name}: {results[case.name]['wall_s'] * 1e3:.1f} ms")
+    return {
+        "version": settings.VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return regressions of results exceeding baseline wall time or payload by more than threshold."""
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for metric in ("wall_s", "payload_bytes"):
+            if base[metric] and result[metric] is not None and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {metric} {base[metric]:.4g} -> {result[metric]:.4g} "
+                    f"(+{(result[metric] / base[metric] - 1) * 100:.0f} %)",
+                )
+    return regressions
+
+
+def save(results: dict, path: pathlib.Path) -> None:
+    """Save results as baseline."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as baselinefile:
+        json.dump(results, baselinefile, indent=2)
+
+
+def load(path: pathlib.Path) -> dict:
+    """Load baseline results."""
+    with path.open("r", encoding="utf-8") as baselinefile:
+        return json.load(baselinefile)
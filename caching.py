@@ -0,0 +1,207 @@
+"""Holds two-tier cache for figures and colour ranges."""
+import collections
+import functools
+import inspect
+import pickle
+import threading
+from collections.abc import Callable, Collection
+
+import pandas as pd
+from cachelib import FileSystemCache
+
+import settings
+import versions
+
+
+class DiskCache(FileSystemCache):
+    """File system cache shared between workers which counts evicted entries."""
+
+    def __init__(self, *args, stats: collections.Counter, **kwargs) -> None:
+        """Init cache with counter to record evictions in."""
+        self._stats = stats
+        super().__init__(*args, **kwargs)
+
+    def _remove_older(self) -> bool:
+        before = self._file_count
+        removed = super()._remove_older()
+        self._stats["disk_evictions"] += max(before - self._file_count, 0)
+        return removed
+
+
+class FigureCache:
+    """
+    Cache with an in-process LRU tier capped by size and a shared on-disk tier.
+
+    Values are pickled once on insert, the pickled size is used to account
+    for the memory tier and the pickled data is stored in the disk tier.
+    Cached values are shared between callers, thus they must not be modified in place.
+    """
+
+    def __init__(self, max_memory_bytes: int, directory: str | None, disk_threshold: int) -> None:
+        """Init memory tier and, if directory is given, disk tier."""
+        self.max_memory_bytes = max_memory_bytes
+        self.stats = collections.Counter()
+        self._memory = collections.OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk = (
+            DiskCache(str(directory), threshold=disk_threshold, default_timeout=0, stats=self.stats)
+            if directory
+            else None
+        )
+
+    def get(self, key: str) -> tuple[bool, object]:
+        """Return whether key was found and its value."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return True, self._memory[key][0]
+        pickled = self._disk.get(key) if self._disk else None
+        if pickled is not None:
+            self.stats["disk_hits"] += 1
+            value = pickle.loads(pickled)  # noqa: S301
+            self._set_memory(key, value, len(pickled))
+            return True, value
+        self.stats["misses"] += 1
+        return False, None
+
+    def has(self, key: str) -> bool:
+        """Return whether key is cached in any tier without loading its value."""
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self._disk and self._disk.has(key))
+
+    def set(self, key: str, value: object) -> None:
+        """Store value in both tiers."""
+        pickled = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._set_memory(key, value, len(pickled))
+        if self._disk:
+            self._disk.set(key, pickled)
+
+    def _set_memory(self, key: str, value: object, size: int) -> None:
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[1]
+            self._memory[key] = (value, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                self.stats["memory_evictions"] += 1
+
+    def pop_memory_entries(self) -> list[tuple[str, object]]:
+        """Remove and return all entries of the memory tier."""
+        with self._lock:
+            entries = [(key, value) for key, (value, _) in self._memory.items()]
+            self._memory.clear()
+            self._memory_bytes = 0
+        return entries
+
+    def disable_disk(self) -> None:
+        """Use memory tier only, e.g. in processes whose entries are collected elsewhere."""
+        self._disk = None
+
+    def discard(self, fingerprints: Collection[str]) -> int:
+        """
+        Remove entries of memory tier whose keys contain any of given data file fingerprints.
+
+        Entries of disk tier cannot be matched by key, they are never hit again and evicted over time.
+        """
+        with self._lock:
+            keys = [key for key in self._memory if any(fingerprint in key for fingerprint in fingerprints)]
+            for key in keys:
+                self._memory_bytes -= self._memory.pop(key)[1]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self._disk:
+            self._disk.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """Return hit, miss and eviction counters and current memory tier size."""
+        with self._lock:
+            return {
+                "memory_hits": self.stats["memory_hits"],
+                "disk_hits": self.stats["disk_hits"],
+                "misses": self.stats["misses"],
+                "memory_evictions": self.stats["memory_evictions"],
+                "disk_evictions": self.stats["disk_evictions"],
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def memoize(self, sets: tuple[str, ...] = (), files: Callable[..., list[str]] | None = None) -> Callable:
+        """
+        Cache results of decorated function by its normalized arguments.
+
+        Arguments named in sets are treated as sets, i.e. their order is ignored.
+        If given, files is called with all arguments by name and returns the data files results are derived from,
+        their fingerprints become part of the key, so results are not reused once these files change.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs) -> object:  # noqa: ANN002
+                key = make_key(func, signature, sets, args, kwargs, files)
+                found, value = self.get(key)
+                if not found:
+                    value = func(*args, **kwargs)
+                    self.set(key, value)
+                return value
+
+            def get_key(*args, **kwargs) -> str:  # noqa: ANN002
+                return make_key(func, signature, sets, args, kwargs, files)
+
+            wrapper.uncached = func
+            wrapper.get_key = get_key
+            return wrapper
+
+        return decorator
+
+
+def normalize(value: object) -> object:
+    """Return hashable representation of callback input."""
+    if isinstance(value, pd.Series):
+        return tuple((index, normalize(item)) for index, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(item) for item in value)
+    return value
+
+
+def make_key(
+    func: Callable,
+    signature: inspect.Signature,
+    sets: tuple[str, ...],
+    args: tuple,
+    kwargs: dict,
+    files: Callable[..., list[str]] | None = None,
+) -> str:
+    """Return cache key of function call with normalized arguments and fingerprints of its data files."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = []
+    for name, value in bound.arguments.items():
+        normalized = normalize(value)
+        if name in sets and value is not None:
+            normalized = tuple(sorted(normalized))
+        arguments.append((name, normalized))
+    sources = versions.get_version().get_sources(files(**bound.arguments)) if files else ()
+    return repr((settings.VERSION, func.__module__, func.__qualname__, tuple(arguments), sources))
+
+
+figure_cache = FigureCache(
+    max_memory_bytes=settings.CACHE_MEMORY_BYTES,
+    directory=settings.CACHE_DIR,
+    disk_threshold=settings.CACHE_DISK_THRESHOLD,
+)
+versions.add_invalidator(figure_cache.discard)
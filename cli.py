@@ -0,0 +1,110 @@
+"""Command line interface for offline build steps."""
+import argparse
+import logging
+import pathlib
+import sys
+
+import settings
+
+
+def build_geometry(args: argparse.Namespace) -> None:
+    """Build simplified geometries for map heights."""
+    import geometry
+
+    geometry.build_geometries(args.heights)
+
+
+def compile_data(args: argparse.Namespace) -> None:  # noqa: ARG001
+    """Compile scenario tables into memory-mappable columns."""
+    import tables
+
+    tables.compile_tables()
+
+
+def warm_cache(args: argparse.Namespace) -> None:
+    """Pre-render common figures into the figure cache."""
+    import warmup
+
+    warmup.warm_up(args.workers)
+
+
+def export_static(args: argparse.Namespace) -> None:
+    """Export common figures with a manifest and a static-only front end."""
+    import static
+
+    static.export(args.output, args.workers, args.single_criteria, args.app_url)
+
+
+def run_benchmark(args: argparse.Namespace) -> None:
+    """Run benchmarks, save them as baseline or compare them against one."""
+    import benchmark
+
+    results = benchmark.run(args.repeat, args.filter)
+    if args.save:
+        benchmark.save(results, args.baseline)
+        logging.info(f"Saved baseline to {args.baseline}.")
+    if args.compare:
+        regressions = benchmark.compare(results, benchmark.load(args.baseline), args.threshold)
+        for regression in regressions:
+            logging.error(f"Regression in {regression}")
+        if regressions:
+            sys.exit(1)
+        logging.info("No regressions found.")
+
+
+def main() -> None:
+    """Run command given on command line."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Build steps for the RGI app.")
+    subparsers = parser.add_subparsers(required=True)
+
+    geometry_parser = subparsers.add_parser(
+        "build-geometry",
+        help="Simplify and quantize map geometries per map height.",
+    )
+    geometry_parser.add_argument("--heights", type=int, nargs="+", default=settings.MAP_HEIGHTS)
+    geometry_parser.set_defaults(func=build_geometry)
+
+    data_parser = subparsers.add_parser(
+        "compile-data",
+        help="Compile scenario csv files into memory-mappable columns.",
+    )
+    data_parser.set_defaults(func=compile_data)
+
+    warmup_parser = subparsers.add_parser(
+        "warm-cache",
+        help="Pre-render common figures into the shared figure cache.",
+    )
+    warmup_parser.add_argument("--workers", type=int, default=settings.WARMUP_WORKERS)
+    warmup_parser.set_defaults(func=warm_cache)
+
+    static_parser = subparsers.add_parser(
+        "export-static",
+        help="Render common figures into compressed json files to be served with a static-only front end.",
+    )
+    static_parser.add_argument("--output", type=pathlib.Path, default=settings.STATIC_BUILD_DIR)
+    static_parser.add_argument("--workers", type=int, default=settings.WARMUP_WORKERS)
+    static_parser.add_argument(
+        "--single-criteria", action="store_true", help="Also export figures of each single criterion.",
+    )
+    static_parser.add_argument("--app-url", help="Url of dash app linked for combinations not exported.")
+    static_parser.set_defaults(func=export_static)
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark",
+        help="Time data layer, figures and callbacks and compare them against a baseline.",
+    )
+    benchmark_parser.add_argument("--repeat", type=int, default=3)
+    benchmark_parser.add_argument("--filter", help="Only run cases containing this string.")
+    benchmark_parser.add_argument("--baseline", type=pathlib.Path, default=settings.BUILD_DIR / "benchmark.json")
+    benchmark_parser.add_argument("--save", action="store_true", help="Save results as baseline.")
+    benchmark_parser.add_argument("--compare", action="store_true", help="Fail on regressions against baseline.")
+    benchmark_parser.add_argument("--threshold", type=float, default=0.2, help="Tolerated relative slowdown.")
+    benchmark_parser.set_defaults(func=run_benchmark)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Holds streaming compression of json responses like dash callback payloads."""
+import zlib
+from collections.abc import Iterable, Iterator
+
+import flask
+
+import metrics
+import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# size (in bytes) of uncompressed chunks fed to the compressor
+CHUNK_SIZE = 64 * 1024
+# wbits selecting gzip container of zlib compressor
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# upper bounds of compression ratio histogram buckets
+RATIO_BUCKETS = (1.5, 2, 3, 4, 6, 8, 12, 16)
+
+
+class Compressor:
+    """Incremental brotli or gzip compressor."""
+
+    def __init__(self, encoding: str) -> None:
+        """Init compressor for given content encoding."""
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+            self.compress = self._compressor.process
+            self.flush = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+            self.compress = self._compressor.compress
+            self.flush = self._compressor.flush
+
+
+def get_encoding() -> str | None:
+    """Return preferred content encoding accepted by the client."""
+    accepted = flask.request.accept_encodings
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, labels: dict[str, str]) -> Iterator[bytes]:
+    """Yield compressed chunks of a stream and record compression ratio once done."""
+    compressor = Compressor(encoding)
+    size = compressed_size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        compressed = compressor.compress(chunk)
+        if compressed:
+            compressed_size += len(compressed)
+            yield compressed
+    compressed = compressor.flush()
+    compressed_size += len(compressed)
+    yield compressed
+    metrics.registry.observe("rgi_response_compression_ratio", size / compressed_size, RATIO_BUCKETS, labels)
+
+
+def compress_chunks(body: bytes, encoding: str, labels: dict[str, str]) -> Iterator[bytes]:
+    """Yield compressed chunks of body and record compression ratio once done."""
+    view = memoryview(body)
+    chunks = (view[start:start + CHUNK_SIZE] for start in range(0, len(view), CHUNK_SIZE))
+    return compress_stream(chunks, encoding, labels)
+
+
+def compress_responses(server: flask.Flask) -> None:
+    """
+    Compress json responses above a size threshold with brotli or gzip, as accepted by the client.
+
+    Responses are compressed while being sent, so the compressed payload is never buffered as a whole.
+    """
+
+    @server.after_request
+    def compress(response: flask.Response) -> flask.Response:
+        if (
+            response.status_code != 200  # noqa: PLR2004
+            or response.mimetype != "application/json"
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = get_encoding()
+        body = response.get_data()
+        if encoding is None or len(body) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        labels = {"encoding": encoding, "callback": flask.g.get("metrics_callback", "none")}
+        response.response = compress_chunks(body, encoding, labels)
+        response.headers["Content-Encoding"] = encoding
+        del response.headers["Content-Length"]
+        return response
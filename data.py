@@ -1,16 +1,25 @@
 """Holds functionality to read data."""
+import collections
 import json
+import pathlib
 
+import numpy as np
 import pandas as pd
 
 import data
+import geometry
+import hierarchy
+import metrics
+import regions
+import resolutions
 import settings
+import shared
+import tables
+import versions
 
 COUNTRY_SHAPES = "regions_onshore_elec_s_30.geojson"
-ONSHORE_GEOJSON_FILENAME = "regions_onshore_elec_s_50.geojson"
-C_ONSHORE_GEOJSON_FILENAME = "countries_onshore_elec_s_50.geojson"
-OFFSHORE_GEOJSON_FILENAME = "regions_offshore_elec_s_50.geojson"
-C_OFFSHORE_GEOJSON_FILENAME = "countries_offshore_elec_s_50.geojson"
+# key of country borders in shared memory, by fingerprint of country shapes
+BORDERS_KEY = "country_borders_{height}@{fingerprint}"
 
 SCENARIOS = ["clever", "tyndp_de", "tyndp_ga", "pac2_0"]
 sce_names = {"CLEVER": "clever", 'TYNDP "Distributed Energy" (DE)': "tyndp_de",
@@ -46,6 +55,15 @@ tech_dict_water = {
     "biomass": "Biomass",
 }
 
+tech_dicts = {"area": tech_dict_area, "water": tech_dict_water}
+requirement_units = {
+    "area": ["area_km2", "oly_field", "rel"],
+    "water": ["water_miom3", "oly_pool"],
+}
+
+# columns requirements of a region are summed by, e.g. for bar charts
+REGION_GROUP_KEYS = ["sce_name", "type", "target_year", "name"]
+
 round_dict_area = {
     "area_km2": 2,
     "oly_field": 1,
@@ -123,64 +141,316 @@ def prepare_data(
     requirement: str,
     year: int,
     criteria: list[str],
-) -> pd.Series:
-    """Filter and aggregate data by given user settings."""
-    df = (
-        data.get_area_requirements(sce_names[scenario])
-        if requirement == "area"
-        else data.get_water_requirements(sce_names[scenario])
-    )
-
-    df = (
-        df.replace(tech_dict_area)
-        if requirement == "area"
-        else df.replace(tech_dict_water)
-    )
+    onshore: bool | None = None,  # noqa: FBT001
+    spatial_res: str = resolutions.DEFAULT_RESOLUTION,
+) -> pd.DataFrame:
+    """
+    Filter and aggregate data by given user settings.
+
+    Filters are applied first as boolean masks over the stored columns, so only
+    surviving rows are rounded, thresholded and copied once into the result.
+    If onshore is given, only onshore (True) or offshore (False) rows are kept.
+    """
+    df = data.get_requirements(sce_names[scenario], requirement, spatial_res)
+    return select_rows(df, np.flatnonzero(get_row_mask(df, year, criteria, onshore)), requirement)
+
+
+def select_rows(df: pd.DataFrame, rows: np.ndarray, requirement: str) -> pd.DataFrame:
+    """Return rounded copy of given rows, leaving out values below one field or pool."""
+    # only keep values with fields or pools >= 1
+    threshold_unit = "oly_field" if requirement == "area" else "oly_pool"
+    round_dict = round_dict_area if requirement == "area" else round_dict_water
+    rounded = np.round(df[threshold_unit].to_numpy()[rows], round_dict[threshold_unit])
+    rows = rows[rounded >= 1]
 
-    df = df[df.target_year == year]
-    df = df[df["type"].isin(criteria)]
-    df = df.rename(columns={"bus": "name"})
+    df = df.take(rows).rename(columns={"bus": "name"}, copy=False)
     # round values
-    df = (
-        df.round(round_dict_area)
-        if requirement == "area"
-        else df.round(round_dict_water)
-    )
-    # only keep values with fields or pools >= 1
-    df = (
-        df.loc[df.oly_field >= 1] if requirement == "area" else df.loc[df.oly_pool >= 1]
+    for unit, decimals in round_dict.items():
+        if unit in df.columns:
+            df[unit] = np.round(df[unit].to_numpy(), decimals)
+    # hand out plain strings, categoricals are only used for compact storage
+    return df.astype({"sce_name": str, "name": str, "type": str}, copy=False)
+
+
+def get_row_mask(df: pd.DataFrame, year: int, criteria: list[str], onshore: bool | None) -> np.ndarray:  # noqa: FBT001
+    """Return mask of rows matching year, criteria and, if given, onshore flag."""
+    mask = df["target_year"].to_numpy() == year
+    types = df["type"]
+    if isinstance(types.dtype, pd.CategoricalDtype):
+        # look up criteria per category once, missing values (code -1) map to the appended False
+        selected = np.append(types.cat.categories.isin(criteria), False)
+        mask &= selected[types.cat.codes.to_numpy()]
+    else:
+        mask &= types.isin(criteria).to_numpy()
+    if onshore is not None:
+        mask &= df["onshore"].to_numpy() == onshore
+    return mask
+
+
+@versions.cache(
+    files=lambda scenario, requirement, spatial_res=resolutions.DEFAULT_RESOLUTION: [
+        *get_resolution_files(requirement, spatial_res, [scenario]),
+        regions.PRETTY_NAMES_FILENAME,
+    ],
+)
+def get_region_index(
+    scenario: str,
+    requirement: str,
+    spatial_res: str = resolutions.DEFAULT_RESOLUTION,
+) -> tuple[pd.DataFrame, dict[str, slice]]:
+    """
+    Return onshore requirements of scenario summed per type and year and their row range per region.
+
+    Countries and the EU missing in the tables (e.g. of region-only clusterings) are rolled up from region rows.
+    Rows are rounded and thresholded as in prepare_data before being summed, sums are sorted by region.
+    Built once per process and data version and shared between callers, thus they must not be modified in place.
+    """
+    df = get_requirements(sce_names[scenario], requirement, spatial_res)
+    df = df.loc[df["onshore"].to_numpy()]
+    df = pd.concat([df, *get_missing_rollups(df, requirement)], ignore_index=True)
+    df = select_rows(df, np.arange(len(df)), requirement)
+    grouped = (
+        df.groupby(REGION_GROUP_KEYS)[requirement_units[requirement]]
+        # units missing in rolled up rows (e.g. ratios without their parts) stay NaN
+        .sum(min_count=1)
+        .reset_index()
+        .sort_values("name", kind="stable", ignore_index=True)
     )
+    names, starts, counts = np.unique(grouped["name"].to_numpy(), return_index=True, return_counts=True)
+    return grouped, {name: slice(start, start + count) for name, start, count in zip(names, starts, counts)}
+
+
+def get_missing_rollups(df: pd.DataFrame, requirement: str) -> list[pd.DataFrame]:
+    """Return rows of countries and the EU rolled up from region rows, for those without rows of their own."""
+    region_hierarchy = hierarchy.get_hierarchy()
+    buses = df["bus"].unique().tolist()
+    regions_df = df.loc[region_hierarchy.get_levels(df["bus"]) == hierarchy.REGION_LEVEL]
+    rollups = []
+    for level in (hierarchy.COUNTRY_LEVEL, hierarchy.EU_LEVEL):
+        groups = region_hierarchy.get_groups(regions_df["bus"].unique().tolist(), level)
+        missing = {code: group for code, group in groups.items() if group not in buses}
+        if missing:
+            rollups.append(
+                hierarchy.rollup(regions_df, missing, ["sce_name", "target_year", "type"], requirement_units[requirement]),
+            )
+    return rollups
+
 
+def get_region_requirements(  # noqa: PLR0913
+    scenario: str,
+    requirement: str,
+    year: int | None,
+    criteria: list[str],
+    region: str,
+    spatial_res: str = resolutions.DEFAULT_RESOLUTION,
+) -> pd.DataFrame:
+    """
+    Return onshore requirements of a region summed per type, looked up independent of the number of regions.
+
+    If year is None, requirements of all years are returned.
+    """
+    grouped, ranges = get_region_index(scenario, requirement, spatial_res)
+    df = grouped.iloc[ranges.get(region, slice(0))]
+    mask = df["type"].isin(criteria).to_numpy()
+    if year is not None:
+        mask &= df["target_year"].to_numpy() == year
+    return df[mask]
+
+
+def parse_table_name(path: pathlib.Path) -> tuple[str, str]:
+    """Return scenario and requirement of scenario table file."""
+    scenario, requirement = path.stem.removesuffix("_joined").rsplit("_", 1)
+    return scenario, requirement
+
+
+def read_requirements(path: pathlib.Path, requirement: str) -> pd.DataFrame:
+    """
+    Read requirement csv into compact dtypes with technology names already mapped.
+
+    Parts of ratio units missing in the csv, e.g. base areas of the 106 region tables,
+    are recovered from the ratio, so ratios of rolled up countries and the EU can be computed.
+    """
+    df = pd.read_csv(path, dtype={"sce_name": "category", "bus": "category"})
+    metrics.registry.inc("rgi_data_loads_total", {"kind": "csv"})
+    df["type"] = df["type"].replace(tech_dicts[requirement]).astype("category")
+    df["target_year"] = pd.to_numeric(df["target_year"], downcast="integer")
+    # values stay float64, float32 keeps about 7 significant digits but e.g. areas of up to 7.7e5 km²
+    # are rounded to 2 decimals, thus rounded values and the threshold of one field or pool would change
+    for unit, (numerator, denominator, factor) in hierarchy.RATIO_UNITS.items():
+        if unit in df.columns and numerator in df.columns and denominator not in df.columns:
+            # unknown where the ratio is zero
+            df[denominator] = (df[numerator] / df[unit] * factor).where(df[unit] > 0)
     return df
 
 
-def get_area_requirements(scenario: str) -> pd.DataFrame:
+def get_data_name(path: pathlib.Path) -> str:
+    """Return name of data file relative to data directory, as used by data versions."""
+    return str(path.relative_to(settings.DATA_DIR))
+
+
+def get_table_files(
+    table_dir: pathlib.Path,
+    requirements: list[str] | None = None,
+    scenarios: list[str] | None = None,
+) -> list[str]:
+    """Return names of scenario table files of a directory, existing or not, of all requirements and scenarios."""
+    return [
+        get_data_name(table_dir / f"{scenario}_{requirement}_joined.csv")
+        for scenario in scenarios or SCENARIOS
+        for requirement in requirements or requirement_units
+    ]
+
+
+def get_resolution_files(requirement: str, spatial_res: str, scenarios: list[str] | None = None) -> list[str]:
+    """Return names of requirement table files of a resolution, of given scenarios (by pretty name) or all."""
+    return get_table_files(
+        resolutions.get_resolution(spatial_res).table_dir,
+        [requirement],
+        [sce_names[scenario] for scenario in scenarios] if scenarios is not None else None,
+    )
+
+
+def get_map_files(requirement: str, spatial_res: str, scenarios: list[str] | None = None) -> list[str]:
+    """Return names of data files maps of a resolution are derived from."""
+    return list(dict.fromkeys([
+        *get_resolution_files(requirement, spatial_res, scenarios),
+        *resolutions.get_resolution(spatial_res).geojsons,
+        COUNTRY_SHAPES,
+        *regions.get_registry_files(spatial_res),
+    ]))
+
+
+def get_table_key(path: pathlib.Path) -> str:
+    """Return key of scenario table in shared memory, by fingerprint of its csv file."""
+    name = get_data_name(path)
+    return f"{name}@{versions.get_version().fingerprints.get(name)}"
+
+
+def load_requirements(path: pathlib.Path) -> pd.DataFrame:
+    """Load scenario table, memory-mapping its compiled columns if available."""
+    df = tables.load_table(path)
+    return df if df is not None else read_requirements(path, parse_table_name(path)[1])
+
+
+def share_data() -> None:
+    """Place scenario tables of all resolutions and country borders of all map heights in shared memory."""
+    table_dirs = dict.fromkeys(resolution.table_dir for resolution in resolutions.RESOLUTIONS.values())
+    for table_dir in table_dirs:
+        for path in sorted(table_dir.glob("*_joined.csv")):
+            shared.share_frame(get_table_key(path), load_requirements(path))
+    for height in settings.MAP_HEIGHTS:
+        lons, lats = get_country_borders.__wrapped__(height)
+        shared.share(get_borders_key(height), {"lon": lons, "lat": lats})
+
+
+def get_borders_key(height: int | None) -> str:
+    """Return key of country borders in shared memory."""
+    return BORDERS_KEY.format(height=height, fingerprint=versions.get_version().fingerprints.get(COUNTRY_SHAPES))
+
+
+# bytes of loaded tables per table directory and of loaded geojson files per (filename, height)
+table_bytes = collections.Counter()
+geojson_bytes = collections.Counter()
+# path of loaded geojson by filename and height, the simplified variant or the full file
+geojson_paths = {}
+
+
+def get_dataset_version(table_dir: pathlib.Path = settings.DATA_DIR) -> str:
+    """Return combined content fingerprint of scenario tables of a directory in the current data version."""
+    return versions.get_version().get_digest(get_table_files(table_dir))
+
+
+@versions.cache(files=lambda path: [get_data_name(path)])
+def get_table(path: pathlib.Path) -> pd.DataFrame:
+    """
+    Load scenario table once per process and content of its file.
+
+    Tables placed in shared memory by the gunicorn master are attached, otherwise
+    compiled tables are memory-mapped if available and csv files are parsed as last resort.
+    """
+    df = shared.attach_frame(get_table_key(path))
+    return df if df is not None else load_requirements(path)
+
+
+@versions.cache(files=lambda table_dir=settings.DATA_DIR: get_table_files(table_dir))
+def get_scenario_store(table_dir: pathlib.Path = settings.DATA_DIR) -> dict[tuple[str, str], pd.DataFrame]:
+    """
+    Load all scenario requirement tables of a directory once per process and data version, on first use.
+
+    Tables of unchanged files are reused from previous versions.
+    Tables are keyed by (scenario, requirement) and shared between callers,
+    thus they must not be modified in place.
+    """
+    store = {}
+    for path in sorted(table_dir.glob("*_joined.csv")):
+        store[parse_table_name(path)] = get_table(path)
+    table_bytes[table_dir] = sum(int(df.memory_usage(deep=True).sum()) for df in store.values())
+    return store
+
+
+def get_requirements(
+    scenario: str,
+    requirement: str,
+    spatial_res: str = resolutions.DEFAULT_RESOLUTION,
+) -> pd.DataFrame:
+    """Return requirement data of scenario at given resolution, empty if the resolution lacks the scenario."""
+    store = get_scenario_store(resolutions.get_resolution(spatial_res).table_dir)
+    if (scenario, requirement) in store:
+        return store[(scenario, requirement)]
+    return next(df for (_, table_requirement), df in store.items() if table_requirement == requirement).iloc[:0]
+
+
+def get_resolution_scenarios(spatial_res: str) -> list[str]:
+    """Return pretty names of scenarios with tables at given resolution."""
+    # read from file names, so tables of resolutions not selected yet are not loaded
+    table_dir = resolutions.get_resolution(spatial_res).table_dir
+    available = {parse_table_name(path)[0] for path in table_dir.glob("*_joined.csv")}
+    return [pretty_name for pretty_name, scenario in sce_names.items() if scenario in available]
+
+
+def get_area_requirements(scenario: str, spatial_res: str = resolutions.DEFAULT_RESOLUTION) -> pd.DataFrame:
     """Return area requirement data."""
-    filename = f"{scenario}_area_joined.csv"
-    return pd.read_csv(settings.DATA_DIR / filename)
+    return get_requirements(scenario, "area", spatial_res)
 
 
-def get_water_requirements(scenario: str) -> pd.DataFrame:
+def get_water_requirements(scenario: str, spatial_res: str = resolutions.DEFAULT_RESOLUTION) -> pd.DataFrame:
     """Return water requirement data."""
-    filename = f"{scenario}_water_joined.csv"
-    return pd.read_csv(settings.DATA_DIR / filename)
+    return get_requirements(scenario, "water", spatial_res)
+
 
+def get_memory_usage() -> dict[str, dict[str, int]]:
+    """
+    Return bytes of loaded tables and geojson files per resolution.
 
-def get_pretty_names(offshore=False) -> dict:
+    Resolutions not used yet report zero, resolutions sharing tables report them each.
+    """
+    return {
+        name: {
+            "tables": table_bytes[resolution.table_dir],
+            "geometries": sum(
+                size for (filename, _), size in geojson_bytes.items() if filename in resolution.geojsons
+            ),
+        }
+        for name, resolution in resolutions.RESOLUTIONS.items()
+    }
+
+
+def get_memory_samples() -> list[tuple[str, tuple, float]]:
+    """Return memory usage per resolution as metric samples."""
+    return [
+        ("rgi_resolution_memory_bytes", (("resolution", name), ("kind", kind)), size)
+        for name, usage in get_memory_usage().items()
+        for kind, size in usage.items()
+    ]
+
+
+metrics.registry.add_collector(get_memory_samples)
+
+
+def get_pretty_names(offshore=False, spatial_res: str = resolutions.DEFAULT_RESOLUTION) -> dict:
     """Return pretty country names data."""
-    filename = "pretty_names.csv"
-    df = pd.read_csv(settings.DATA_DIR / filename)
-    if offshore:
-        df["pretty_name"] = [", ".join([df.country_name[i], df.Name[i], "Offshore "])
-                             if df.boolean[i]
-                             else ", ".join([df.country_name[i], "Offshore "])
-                             for i in df.index]
-    else:
-        df["pretty_name"] = [", ".join([df.country_name[i], df.Name[i]])
-                             if df.boolean[i]
-                             else ", ".join([df.country_name[i]])
-                             for i in df.index]
-    return dict(zip(df.name, df.pretty_name))
+    registry = regions.get_registry(spatial_res)
+    return dict(registry.offshore_pretty_names if offshore else registry.pretty_names)
 
 
 def get_scenarios() -> list[str]:
@@ -222,43 +492,66 @@ def get_criteria(requirement: str) -> list[str]:
         else get_water_requirements(SCENARIOS[0])
     )
 
-    dataset = (
-        dataset.replace(tech_dict_area)
-        if requirement == "area"
-        else dataset.replace(tech_dict_water)
-    )
-    if requirement == "water":
-        criteria = dataset["type"].sort_values().unique().tolist()
-    else:
-        criteria = dataset["type"].sort_values().unique().tolist()
+    criteria = sorted(dataset["type"].unique().tolist())
+    if requirement == "area":
         criteria.remove('Nature-protected area')
         criteria.insert(len(criteria)-1, 'Nature-protected area')
     return criteria
 
 
-def get_regions(spatial_res) -> dict:
+@versions.cache(files=lambda filename, height=None: [filename])
+def load_geojson(filename: str, height: int | None = None) -> dict:
+    """
+    Load geojson, preferring the simplified variant built for given figure height unless it is outdated.
+
+    Geojsons are cached and shared between callers, thus they must not be modified in place.
+    """
+    path = settings.DATA_DIR / filename
+    if height is not None and is_built_after(geometry.get_variant_path(filename, height), path):
+        path = geometry.get_variant_path(filename, height)
+    metrics.registry.inc("rgi_data_loads_total", {"kind": "geojson"})
+    geojson_bytes[(filename, height)] = path.stat().st_size
+    geojson_paths[(filename, height)] = path
+    with path.open("r", encoding="utf-8") as geojsonfile:
+        return json.load(geojsonfile)
+
+
+def get_regions(spatial_res, height: int | None = None) -> dict:
     """Get onshore regions."""
-    if spatial_res == "region":
-        with (settings.DATA_DIR / ONSHORE_GEOJSON_FILENAME).open(
-                "r",
-                encoding="utf-8",
-        ) as geojsonfile:
-            return json.load(geojsonfile)
-    elif spatial_res == "country":
-        with (settings.DATA_DIR / C_ONSHORE_GEOJSON_FILENAME).open(
-                "r",
-                encoding="utf-8",
-        ) as geojsonfile:
-            return json.load(geojsonfile)
-
-
-def get_country_shapes() -> dict:
+    return load_geojson(resolutions.get_resolution(spatial_res).onshore_geojson, height)
+
+
+def get_regions_urls(spatial_res: str, height: int | None = None) -> list[str]:
+    """Get urls of onshore and offshore regions published as static assets."""
+    return [geometry.get_asset_url(filename, height) for filename in resolutions.get_resolution(spatial_res).geojsons]
+
+
+def get_country_shapes(height: int | None = None) -> dict:
     """Get onshore regions."""
-    with (settings.DATA_DIR / COUNTRY_SHAPES).open(
-        "r",
-        encoding="utf-8",
-    ) as geojsonfile:
-        return json.load(geojsonfile)
+    return load_geojson(COUNTRY_SHAPES, height)
+
+
+def is_built_after(path: pathlib.Path, source: pathlib.Path) -> bool:
+    """Return whether file built from source exists and is newer than its source."""
+    return path.exists() and path.stat().st_mtime_ns >= source.stat().st_mtime_ns
+
+
+@versions.cache(files=lambda height=None: [COUNTRY_SHAPES])
+def get_country_borders(height: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Get longitudes and latitudes of country borders, precomputed ones if built for given figure height."""
+    borders = shared.attach(get_borders_key(height))
+    if borders is not None:
+        return borders["lon"], borders["lat"]
+    path = settings.GEOMETRY_BUILD_DIR / geometry.COUNTRY_BORDERS_FILENAME.format(height=height)
+    if height is not None and is_built_after(path, settings.DATA_DIR / COUNTRY_SHAPES):
+        metrics.registry.inc("rgi_data_loads_total", {"kind": "borders"})
+        with path.open("r", encoding="utf-8") as bordersfile:
+            borders = json.load(bordersfile)
+        lons, lats = borders["lon"], borders["lat"]
+    else:
+        lons, lats = state_boundaries(get_country_shapes(height))
+    # float arrays (polygon ends as NaN) keep coordinates in two buffers instead of many objects
+    return np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
 
 
 # function to get state boundaries from country shapes geojson
@@ -288,74 +581,73 @@ def state_boundaries(geojdata: object) -> tuple:
     return lons, lats
 
 
-def get_regions_offshore(spatial_res) -> dict:
+def get_regions_offshore(spatial_res, height: int | None = None) -> dict:
     """Get offshore regions."""
-    if spatial_res == "region":
-        with (settings.DATA_DIR / OFFSHORE_GEOJSON_FILENAME).open(
-                "r",
-                encoding="utf-8",
-        ) as geojsonfile:
-            return json.load(geojsonfile)
-    elif spatial_res == "country":
-        with (settings.DATA_DIR / C_OFFSHORE_GEOJSON_FILENAME).open(
-                "r",
-                encoding="utf-8",
-        ) as geojsonfile:
-            return json.load(geojsonfile)
+    return load_geojson(resolutions.get_resolution(spatial_res).offshore_geojson, height)
 
 
-def get_min_max(req: str, criteria: list[str], spatial_res: str) -> (pd.DataFrame, pd.DataFrame):
-    """Get min and max values for each unit of area requirement."""
-    data_dict = {}
-    if req == "area":
-        for scenario in SCENARIOS:
-            df = data.get_area_requirements(scenario)
-            df = df.replace(
-                tech_dict_area,
-            )
-            data_dict[scenario] = df[(df["type"].isin(criteria)) & (df.onshore)]
-
-        data_df = pd.concat(data_dict)
-        if spatial_res == "region":
-            data_df = data_df.loc[[True if len(region) > 3
-                                   else False for region in data_df.bus]]
-        elif spatial_res == "country":
-            data_df = data_df.loc[[True if (len(region) < 3) & (region != "EU")
-                                   else False for region in data_df.bus]]
-        data_df = (
-            data_df.groupby(["bus", "target_year", "sce_name"])
-            # differentiation possible for aggregation in case e.g. percentage needs to be averaged instead of summed
-            .aggregate({"area_km2": "sum", "oly_field": "sum", "rel": "sum"})[
-                ["area_km2", "oly_field", "rel"]
-            ].reset_index()[["sce_name", "target_year", "area_km2", "oly_field", "rel"]]
-        )
-    elif req == "water":
-        for scenario in SCENARIOS:
-            df = data.get_water_requirements(scenario)
-            df = df.replace(
-                tech_dict_water,
-            )
-            data_dict[scenario] = df[(df["type"].isin(criteria)) & (df.onshore)]
-        data_df = pd.concat(data_dict)
-        if spatial_res == "region":
-            data_df = data_df.loc[[True if len(region) > 3
-                                   else False for region in data_df.bus]]
-        elif spatial_res == "country":
-            data_df = data_df.loc[[True if (len(region) < 3) & (region != "EU")
-                                   else False for region in data_df.bus]]
-        data_df = (
-            data_df.groupby(["bus", "target_year", "sce_name"])
-            .sum()[["water_miom3", "oly_pool"]]
-            .reset_index()[["sce_name", "target_year", "water_miom3", "oly_pool"]]
-        )
-    else:
-        msg = "Invalid requirement. Call for either 'area' or 'water'."
+class ExceptionReqError(Exception):
+    """Raised if an unknown requirement is requested."""
 
-        class ExceptionReqError(Exception):
-            pass
 
+@versions.cache(
+    files=lambda req, spatial_res=resolutions.DEFAULT_RESOLUTION: [
+        *get_resolution_files(req, spatial_res),
+        regions.PRETTY_NAMES_FILENAME,
+    ],
+)
+def get_colour_range_cube(req: str, spatial_res: str = resolutions.DEFAULT_RESOLUTION) -> pd.DataFrame:
+    """
+    Pre-aggregate onshore values of all scenarios of a resolution per year, bus and type.
+
+    Only buses at the level of the resolution are kept, country values are rolled up from region rows.
+    Rows are indexed by (sce_name, target_year, bus), columns by (unit, type).
+    Missing combinations of bus and type are NaN.
+    """
+    if req not in requirement_units:
+        msg = "Invalid requirement. Call for either 'area' or 'water'."
         raise ExceptionReqError(msg)
+    resolution = resolutions.get_resolution(spatial_res)
+    store = get_scenario_store(resolution.table_dir)
+    data_df = pd.concat(
+        df.loc[df.onshore] for (_, requirement), df in store.items() if requirement == req
+    )
+    region_hierarchy = hierarchy.get_hierarchy()
+    data_df = data_df.loc[region_hierarchy.get_levels(data_df["bus"]) == hierarchy.REGION_LEVEL]
+    keys = ["sce_name", "target_year", "type"]
+    if resolution.level != hierarchy.REGION_LEVEL:
+        groups = region_hierarchy.get_groups(data_df["bus"].unique().tolist(), resolution.level)
+        data_df = hierarchy.rollup(data_df, groups, keys, requirement_units[req])
+    return (
+        data_df.groupby(["sce_name", "target_year", "bus", "type"], observed=True)[requirement_units[req]]
+        .sum()
+        .unstack("type")
+    )
 
-    min_vals = data_df.groupby(by=["sce_name", "target_year"]).min().reset_index()
-    max_vals = data_df.groupby(by=["sce_name", "target_year"]).max().reset_index()
-    return min_vals, max_vals
+
+def get_min_max(req: str, criteria: list[str], spatial_res: str) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Get min and max values for each unit of given requirement.
+
+    Results are memoized per set of criteria and shared between callers,
+    thus they must not be modified in place.
+    """
+    return _get_min_max(req, frozenset(criteria), spatial_res)
+
+
+@versions.cache(
+    files=lambda req, criteria, spatial_res: [*get_resolution_files(req, spatial_res), regions.PRETTY_NAMES_FILENAME],
+)
+def _get_min_max(req: str, criteria: frozenset[str], spatial_res: str) -> (pd.DataFrame, pd.DataFrame):
+    cube = get_colour_range_cube(req, spatial_res)
+    # sum selected types per bus, buses without any selected type are left out
+    selected = cube.columns.get_level_values("type").isin(criteria)
+    sums = {}
+    for unit in requirement_units[req]:
+        values = cube.loc[:, selected & (cube.columns.get_level_values(0) == unit)].to_numpy()
+        missing = np.isnan(values).all(axis=1)
+        sums[unit] = np.where(missing, np.nan, np.nansum(values, axis=1))
+    data_df = pd.DataFrame(sums, index=cube.index).dropna(how="all")
+
+    grouped = data_df.groupby(level=["sce_name", "target_year"])
+    return grouped.min().reset_index(), grouped.max().reset_index()
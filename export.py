@@ -0,0 +1,179 @@
+"""Holds streaming export of filtered requirement tables for bulk download."""
+import hashlib
+import io
+import json
+from collections.abc import Iterator
+
+import flask
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+import compression
+import data
+import hierarchy
+import metrics
+import resolutions
+
+EXPORT_URL_PREFIX = "/export/"
+# mimetypes of export formats, arrow requires pyarrow
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def get_available_formats() -> list[str]:
+    """Return export formats supported by installed packages."""
+    return [fmt for fmt in FORMATS if fmt != "arrow" or pa is not None]
+
+
+def parse_filters(requirement: str) -> dict:
+    """
+    Return filters of export request, aborting with 400 on unknown values.
+
+    Repeated query parameters select several values, omitted ones select all values.
+    Scenarios are given by their short names, e.g. "tyndp_de".
+    """
+    if requirement not in data.requirement_units:
+        flask.abort(400, f"Unknown requirement '{requirement}'.")
+    args = flask.request.args
+
+    def get_values(name: str, choices: list, convert: type = str) -> list:
+        try:
+            values = [convert(value) for value in args.getlist(name)]
+        except ValueError:
+            flask.abort(400, f"Invalid value of '{name}'.")
+        unknown = [value for value in values if value not in choices]
+        if unknown:
+            flask.abort(400, f"Unknown values of '{name}': {', '.join(map(str, unknown))}.")
+        return values or list(choices)
+
+    spatial_res = args.get("spatial_res", resolutions.DEFAULT_RESOLUTION)
+    if spatial_res not in resolutions.RESOLUTIONS:
+        flask.abort(400, f"Unknown spatial resolution '{spatial_res}'.")
+    return {
+        "scenarios": get_values("scenario", data.SCENARIOS),
+        "requirement": requirement,
+        "years": get_values("year", data.get_years(), int),
+        "criteria": get_values("criteria", data.get_criteria(requirement)),
+        "spatial_res": spatial_res,
+        # regions are not validated, unknown ones simply match no rows
+        "regions": args.getlist("region"),
+    }
+
+
+def get_etag(filters: dict, fmt: str) -> str:
+    """Return etag of export from dataset version, filters and format."""
+    version = data.get_dataset_version(resolutions.get_resolution(filters["spatial_res"]).table_dir)
+    key = json.dumps([version, filters, fmt], sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def get_frames(filters: dict) -> Iterator[pd.DataFrame]:
+    """
+    Yield filtered rows per scenario and year as returned by data.prepare_data.
+
+    Only rows at the level of the spatial resolution are kept, i.e. the rows shown in its map.
+    """
+    resolution = resolutions.get_resolution(filters["spatial_res"])
+    for scenario in filters["scenarios"]:
+        for year in filters["years"]:
+            df = data.prepare_data(
+                data.sce_pretty_names[scenario],
+                filters["requirement"],
+                year,
+                filters["criteria"],
+                spatial_res=resolution.name,
+            )
+            mask = hierarchy.get_hierarchy().get_levels(df["name"]) == resolution.level
+            if filters["regions"]:
+                mask &= df["name"].isin(filters["regions"]).to_numpy()
+            if mask.any():
+                yield df[mask]
+
+
+def write_csv(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Yield csv chunks with a single header line."""
+    header = True
+    for df in frames:
+        yield df.to_csv(index=False, header=header).encode()
+        header = False
+
+
+def write_ndjson(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Yield chunks of one json record per line."""
+    for df in frames:
+        yield df.to_json(orient="records", lines=True).encode()
+
+
+def write_arrow(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Yield chunks of an arrow ipc stream with one record batch per frame."""
+    sink = io.BytesIO()
+    writer = None
+    for df in frames:
+        batch = pa.RecordBatch.from_pandas(df, preserve_index=False)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield pop_buffer(sink)
+    if writer is not None:
+        writer.close()
+        yield pop_buffer(sink)
+
+
+def pop_buffer(buffer: io.BytesIO) -> bytes:
+    """Return and clear content of buffer."""
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "arrow": write_arrow}
+
+
+def count_rows(frames: Iterator[pd.DataFrame], fmt: str) -> Iterator[pd.DataFrame]:
+    """Pass frames through, counting exported rows."""
+    rows = 0
+    for df in frames:
+        rows += len(df)
+        yield df
+    metrics.registry.inc("rgi_export_rows_total", {"format": fmt}, rows)
+
+
+def serve_exports(server: flask.Flask) -> None:
+    """
+    Serve filtered requirement tables as streamed csv, ndjson or arrow downloads.
+
+    Rows are written per scenario and year while being sent, so the export is never buffered as a whole.
+    Exports are compressed with brotli or gzip if accepted by the client and revalidated via etags.
+    """
+
+    @server.route(f"{EXPORT_URL_PREFIX}<requirement>.<fmt>")
+    def export(requirement: str, fmt: str) -> flask.Response:
+        if fmt not in get_available_formats():
+            flask.abort(404)
+        filters = parse_filters(requirement)
+        encoding = compression.get_encoding()
+        etag = get_etag(filters, fmt) + (f"-{encoding}" if encoding else "")
+        # checked up front, as conditional responses would buffer the stream to compute its length
+        if flask.request.if_none_match.contains(etag):
+            response = flask.Response(status=304)
+        else:
+            # generators are lazy, nothing is read before the response is sent
+            chunks = WRITERS[fmt](count_rows(get_frames(filters), fmt))
+            if encoding:
+                chunks = compression.compress_stream(chunks, encoding, {"encoding": encoding, "callback": "export"})
+            response = flask.Response(chunks, mimetype=FORMATS[fmt])
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            response.headers["Content-Disposition"] = f"attachment; filename=rgi_{requirement}.{fmt}"
+            metrics.registry.inc("rgi_exports_total", {"format": fmt})
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        return response
@@ -0,0 +1,124 @@
+// Static-only front end loading figures exported by `python cli.py export-static`, see static.py
+const ALL_CRITERIA = "all";
+const GZIP_MAGIC = [0x1f, 0x8b];
+const config = {responsive: true};
+const state = {manifest: null, region: null};
+
+// Replace options of a select by {label, value} pairs and select value, the first option by default
+function setOptions(id, options, value) {
+    const select = document.getElementById(id);
+    select.replaceChildren(...options.map((option) => new Option(option.label, option.value)));
+    select.value = value === undefined ? options[0].value : value;
+}
+
+function getValue(id) {
+    return document.getElementById(id).value;
+}
+
+// Return key of figure as built by static.get_figure_key
+function getFigureKey(kind, ...parts) {
+    return [kind, getValue("spatial_res"), getValue("scenario"), getValue("year"), getValue("requirement"),
+        getValue("unit"), getValue("criteria"), ...parts].join("/");
+}
+
+// Fetch figure json, decompressing it unless the server already did via Content-Encoding
+async function fetchFigure(path) {
+    const buffer = await (await fetch(path)).arrayBuffer();
+    const bytes = new Uint8Array(buffer);
+    if (bytes[0] !== GZIP_MAGIC[0] || bytes[1] !== GZIP_MAGIC[1]) {
+        return JSON.parse(new TextDecoder().decode(bytes));
+    }
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return JSON.parse(await new Response(stream).text());
+}
+
+// Show figure of key, or a link to the dash app if it was not exported
+async function showFigure(id, key) {
+    const path = state.manifest.figures[key];
+    const notice = document.getElementById("notice");
+    if (path === undefined) {
+        notice.style.display = state.manifest.app_url ? "block" : "none";
+        Plotly.purge(id);
+        return;
+    }
+    notice.style.display = "none";
+    const fig = await fetchFigure(path);
+    await Plotly.react(id, fig.data, fig.layout, config);
+}
+
+function updateBarChart() {
+    return showFigure("bar_chart", getFigureKey("bar_chart", state.region));
+}
+
+// Change regions of drop down to those of selected resolution, keeping the region if it is named there
+function updateRegions() {
+    const options = state.manifest.regions[getValue("spatial_res")];
+    if (!options.some((option) => option.value === state.region)) {
+        state.region = state.manifest.default_region;
+    }
+    setOptions("region_dd", options, state.region);
+}
+
+async function update() {
+    await showFigure("choropleth", getFigureKey("choropleth"));
+    await updateBarChart();
+}
+
+// Change units and criteria to those of selected requirement
+function updateRequirement() {
+    const requirement = state.manifest.requirements[getValue("requirement")];
+    setOptions("unit", requirement.units, requirement.default_unit);
+    setOptions(
+        "criteria",
+        requirement.criteria.map((criteria) => ({
+            label: criteria === ALL_CRITERIA ? "All criteria" : criteria,
+            value: criteria,
+        })),
+    );
+}
+
+async function init() {
+    const manifest = await (await fetch("manifest.json")).json();
+    state.manifest = manifest;
+    state.region = manifest.default_region;
+    setOptions("scenario", manifest.scenarios);
+    setOptions("year", manifest.years.map((year) => ({label: String(year), value: String(year)})));
+    setOptions("spatial_res", manifest.spatial_resolutions);
+    setOptions("requirement", Object.entries(manifest.requirements).map(
+        ([value, requirement]) => ({label: requirement.label, value: value}),
+    ));
+    updateRegions();
+    updateRequirement();
+    if (manifest.app_url) {
+        document.getElementById("app_link").href = manifest.app_url;
+    }
+
+    for (const id of ["scenario", "year", "unit", "criteria"]) {
+        document.getElementById(id).addEventListener("change", update);
+    }
+    document.getElementById("spatial_res").addEventListener("change", () => {
+        updateRegions();
+        update();
+    });
+    document.getElementById("requirement").addEventListener("change", () => {
+        updateRequirement();
+        update();
+    });
+    document.getElementById("region_dd").addEventListener("change", () => {
+        state.region = getValue("region_dd");
+        updateBarChart();
+    });
+
+    await update();
+    // regions clicked on the map are shown in the bar chart and, if listed, in the region drop down
+    document.getElementById("choropleth").on("plotly_click", (event) => {
+        state.region = event.points[0].location;
+        const select = document.getElementById("region_dd");
+        if ([...select.options].some((option) => option.value === state.region)) {
+            select.value = state.region;
+        }
+        updateBarChart();
+    });
+}
+
+init();
@@ -0,0 +1,281 @@
+"""Holds functionality to build simplified map geometries for display and publish them as static assets."""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+
+import flask
+import numpy as np
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import data
+import resolutions
+import settings
+import versions
+
+# decimals kept for coordinates of simplified geometries (~100 m)
+COORDINATE_DECIMALS = 3
+# latitude extent (in degrees) shown in maps, used to derive degrees per pixel
+MAP_LAT_EXTENT = 36
+
+# geometries sharing borders are simplified together to keep them gap-free
+GEOMETRY_GROUPS = [
+    *(list(geojsons) for geojsons in dict.fromkeys(r.geojsons for r in resolutions.RESOLUTIONS.values())),
+    ["regions_onshore_elec_s_30.geojson"],
+]
+COUNTRY_BORDERS_FILENAME = "country_borders_{height}.json"
+
+ASSET_URL_PREFIX = "/geometry/"
+ASSET_MIMETYPE = "application/geo+json"
+# published assets are named by content hash, thus never change
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ASSET_HASH_LENGTH = 16
+# content encodings of pre-compressed asset variants in order of preference
+ASSET_ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def get_tolerance(height: int) -> float:
+    """Return simplification tolerance (in degrees) of half a pixel for given figure height."""
+    return MAP_LAT_EXTENT / height / 2
+
+
+def get_variant_path(filename: str, height: int) -> pathlib.Path:
+    """Return path of simplified geometry variant for given figure height."""
+    path = pathlib.Path(filename)
+    return settings.GEOMETRY_BUILD_DIR / f"{path.stem}_{height}{path.suffix}"
+
+
+def get_rings(geojson: dict) -> list[list]:
+    """Return all polygon rings of a geojson feature collection."""
+    rings = []
+    for feature in geojson["features"]:
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            rings.extend(geometry["coordinates"])
+        elif geometry["type"] == "MultiPolygon":
+            for polygon in geometry["coordinates"]:
+                rings.extend(polygon)
+    return rings
+
+
+def quantize(ring: list) -> np.ndarray:
+    """Round ring coordinates and drop consecutive duplicates."""
+    coords = np.round(np.asarray(ring, dtype=float)[:, :2], COORDINATE_DECIMALS)
+    keep = np.ones(len(coords), dtype=bool)
+    keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+    return coords[keep]
+
+
+def douglas_peucker(coords: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify line keeping its end points."""
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:  # noqa: PLR2004
+            continue
+        segment = coords[end] - coords[start]
+        points = coords[start + 1:end] - coords[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(points[:, 0], points[:, 1])
+        else:
+            distances = np.abs(segment[0] * points[:, 1] - segment[1] * points[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.extend([(start, split), (split, end)])
+    return coords[keep]
+
+
+def simplify_arc(arc: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify arc in canonical direction, so shared arcs give identical results."""
+    if tuple(arc[0]) > tuple(arc[-1]):
+        return douglas_peucker(arc[::-1], tolerance)[::-1]
+    return douglas_peucker(arc, tolerance)
+
+
+def get_nodes(rings: list[np.ndarray]) -> set[tuple[float, float]]:
+    """
+    Return points at which shared borders start or end.
+
+    A point is a node if the rings running through it differ from the rings
+    running through one of its neighbours.
+    """
+    memberships = {}
+    for ring_id, ring in enumerate(rings):
+        for point in map(tuple, ring):
+            memberships.setdefault(point, set()).add(ring_id)
+    nodes = set()
+    for ring in rings:
+        points = [tuple(point) for point in ring[:-1]]
+        for i, point in enumerate(points):
+            if (
+                memberships[point] != memberships[points[i - 1]]
+                or memberships[point] != memberships[points[(i + 1) % len(points)]]
+            ):
+                nodes.add(point)
+    return nodes
+
+
+def simplify_ring(ring: np.ndarray, nodes: set, tolerance: float) -> list[list[float]]:
+    """Simplify closed ring between its nodes."""
+    points = ring[:-1]
+    indices = [i for i, point in enumerate(map(tuple, points)) if point in nodes]
+    if not indices:
+        # isolated ring (e.g. an island), anchor at its lowest and the point farthest from it
+        lowest = int(np.lexsort((points[:, 1], points[:, 0]))[0])
+        farthest = int(np.argmax(np.hypot(*(points - points[lowest]).T)))
+        indices = sorted({lowest, farthest})
+    # rotate ring to start at first node, so arcs do not wrap around
+    points = np.roll(points, -indices[0], axis=0)
+    indices = [i - indices[0] for i in indices] + [len(points)]
+    closed = np.vstack([points, points[:1]])
+    simplified = [closed[:1]]
+    for start, end in zip(indices[:-1], indices[1:]):
+        simplified.append(simplify_arc(closed[start:end + 1], tolerance)[1:])
+    simplified = np.vstack(simplified)
+    if len(simplified) < 4:  # noqa: PLR2004
+        # keep rings which would collapse
+        simplified = ring
+    return simplified.tolist()
+
+
+def simplify_geojsons(geojsons: list[dict], tolerance: float) -> list[dict]:
+    """Simplify geojson feature collections with shared topology."""
+    rings = [quantize(ring) for geojson in geojsons for ring in get_rings(geojson)]
+    rings = [ring for ring in rings if len(ring) >= 4]  # noqa: PLR2004
+    nodes = get_nodes(rings)
+
+    def simplify_polygon(polygon: list) -> list:
+        simplified = []
+        for ring in polygon:
+            coords = quantize(ring)
+            if len(coords) >= 4:  # noqa: PLR2004
+                simplified.append(simplify_ring(coords, nodes, tolerance))
+        return simplified
+
+    results = []
+    for geojson in geojsons:
+        features = []
+        for feature in geojson["features"]:
+            geometry = feature["geometry"]
+            if geometry["type"] == "Polygon":
+                coordinates = simplify_polygon(geometry["coordinates"])
+            elif geometry["type"] == "MultiPolygon":
+                coordinates = [simplify_polygon(polygon) for polygon in geometry["coordinates"]]
+            else:
+                coordinates = geometry["coordinates"]
+            features.append(
+                {
+                    "type": "Feature",
+                    "properties": feature["properties"],
+                    "geometry": {"type": geometry["type"], "coordinates": coordinates},
+                },
+            )
+        results.append({"type": "FeatureCollection", "features": features})
+    return results
+
+
+def build_geometries(heights: list[int]) -> None:
+    """Write simplified geometries and country borders for given figure heights."""
+    settings.GEOMETRY_BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    for filenames in GEOMETRY_GROUPS:
+        geojsons = []
+        for filename in filenames:
+            with (settings.DATA_DIR / filename).open("r", encoding="utf-8") as geojsonfile:
+                geojsons.append(json.load(geojsonfile))
+        for height in heights:
+            simplified = simplify_geojsons(geojsons, get_tolerance(height))
+            for filename, geojson in zip(filenames, simplified):
+                path = get_variant_path(filename, height)
+                with path.open("w", encoding="utf-8") as geojsonfile:
+                    json.dump(geojson, geojsonfile, separators=(",", ":"))
+                logging.info(f"Built {path.name} ({path.stat().st_size / 1e3:.0f} kB).")
+                if filename == data.COUNTRY_SHAPES:
+                    lons, lats = data.state_boundaries(geojson)
+                    borders_path = settings.GEOMETRY_BUILD_DIR / COUNTRY_BORDERS_FILENAME.format(height=height)
+                    with borders_path.open("w", encoding="utf-8") as bordersfile:
+                        json.dump({"lon": lons, "lat": lats}, bordersfile, separators=(",", ":"))
+                else:
+                    logging.info(f"Published {filename} for height {height} at {get_asset_url(filename, height)}.")
+
+
+def write_atomic(path: pathlib.Path, content: bytes) -> None:
+    """Write file via a temporary file, so concurrent workers never serve partial assets."""
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmpfile:
+        tmpfile.write(content)
+    os.chmod(tmpfile.name, 0o644)  # noqa: PTH101
+    os.replace(tmpfile.name, path)
+
+
+def publish_geojson(geojson: dict, stem: str) -> str:
+    """
+    Write geojson as static asset named by its content hash and return asset name.
+
+    Gzip and, if brotli is installed, brotli compressed variants are written alongside.
+    """
+    content = json.dumps(geojson, separators=(",", ":")).encode("utf-8")
+    name = f"{stem}.{hashlib.sha256(content).hexdigest()[:ASSET_HASH_LENGTH]}.geojson"
+    path = settings.ASSETS_BUILD_DIR / name
+    if path.exists():
+        return name
+    settings.ASSETS_BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    write_atomic(path.with_name(name + ASSET_ENCODINGS["gzip"]), gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write_atomic(path.with_name(name + ASSET_ENCODINGS["br"]), brotli.compress(content))
+    # uncompressed asset is written last, as its existence marks the asset as published
+    write_atomic(path, content)
+    return name
+
+
+@versions.cache(files=lambda filename, height=None: [filename])
+def get_asset_url(filename: str, height: int | None = None) -> str:
+    """
+    Return url of geojson published as static asset, preferring simplified variant for given figure height.
+
+    Assets are named after the file loaded, i.e. after the full file if no up-to-date variant was built.
+    """
+    geojson = data.load_geojson(filename, height)
+    return ASSET_URL_PREFIX + publish_geojson(geojson, data.geojson_paths[(filename, height)].stem)
+
+
+def serve_assets(server: flask.Flask) -> None:
+    """Serve published geometry assets, pre-compressed if accepted by the client."""
+
+    @server.route(f"{ASSET_URL_PREFIX}<name>")
+    def geometry_asset(name: str) -> flask.Response:
+        path = safe_join(str(settings.ASSETS_BUILD_DIR), name)
+        if path is None or not os.path.isfile(path):  # noqa: PTH113
+            flask.abort(404)
+        encoding = next(
+            (
+                encoding
+                for encoding, suffix in ASSET_ENCODINGS.items()
+                if encoding in flask.request.accept_encodings and os.path.isfile(path + suffix)  # noqa: PTH113
+            ),
+            None,
+        )
+        suffix = ASSET_ENCODINGS[encoding] if encoding else ""
+        response = flask.send_file(
+            path + suffix,
+            mimetype=ASSET_MIMETYPE,
+            download_name=name,
+            etag=name + suffix,
+            conditional=True,
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Cache-Control"] = ASSET_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
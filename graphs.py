@@ -1,15 +1,27 @@
 """Holds functionality for plotly graphs."""
+import dataclasses
+
 import numpy as np
 import pandas as pd
+from dash import Patch
 from plotly import express as px
 from plotly import graph_objects as go
 
 import data
+import regions
+import resolutions
+import versions
+from caching import figure_cache
 
 # add font variable to adjust graph font
 FONT = "Lato"
 FONT_COLOR = "#1f2120"
 
+# trace properties holding geometry, these are kept on the client for partial updates
+GEOMETRY_PROPERTIES = ("geojson", "lon", "lat")
+# duration (in ms) each year is shown when playing an animated choropleth
+ANIMATION_FRAME_DURATION = 1000
+
 # pretty labels for pretty plotting
 pretty_labels = {
     "area_km2": "Area (in km²)",
@@ -29,10 +41,120 @@ pretty_labels = {
 }
 
 
-def blank_fig() -> go.Figure:
-    """Return empty figure."""
+# appended to pretty names of regions in hover boxes
+ONSHORE_HOVER_SUFFIX = " <br> <i>Click to show bar plot with more detailed information below.</i>"
+OFFSHORE_HOVER_SUFFIX = ":<br> <i>Click to show bar plot with more detailed information below.</i>"
+# types shown in hover boxes of offshore regions and their labels per unit
+OFFSHORE_HOVER_TYPES = {"Offshore wind": "Offshore wind area", "Nature-protected area": "Nature-protected area"}
+OFFSHORE_HOVER_UNITS = {"rel": "(in %)", "area_km2": "(in km²)", "oly_field": "(in Soccer Fields)"}
+
+
+@dataclasses.dataclass(frozen=True)
+class LocationValues:
+    """Values summed per location (rows) and type (columns), with hover labels of locations."""
+
+    names: np.ndarray
+    hover_names: np.ndarray
+    values: np.ndarray
+    # marks location and type pairs having any values
+    present: np.ndarray
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        unit: str,
+        types: np.ndarray,
+        pretty_names: dict[str, str],
+        hover_suffix: str,
+    ) -> "LocationValues":
+        """Sum values of rows per location and type, missing values count as zero."""
+        names, rows = np.unique(df["name"].to_numpy(), return_inverse=True)
+        columns = np.searchsorted(types, df["type"].to_numpy())
+        values = np.zeros((len(names), len(types)))
+        np.add.at(values, (rows, columns), np.nan_to_num(df[unit].to_numpy(dtype=float)))
+        present = np.zeros((len(names), len(types)), dtype=bool)
+        present[rows, columns] = True
+        hover_names = np.array([pretty_names.get(name, name) + hover_suffix for name in names], dtype=object)
+        return cls(names=names, hover_names=hover_names, values=values, present=present)
+
+    def select(self, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return rows of locations having values of masked types and their sums over these types."""
+        rows = self.present[:, mask].any(axis=1)
+        return rows, self.values[rows][:, mask].sum(axis=1)
+
+
+@dataclasses.dataclass(frozen=True)
+class MapFrames:
+    """
+    Figure-ready values of a scenario, year and unit for onshore and offshore regions of a choropleth.
+
+    Selecting criteria only masks type columns, thus per request work is left to a masked sum.
+    """
+
+    unit: str
+    types: np.ndarray
+    onshore: LocationValues
+    offshore: LocationValues
+
+    def select(self, criteria: list[str]) -> tuple[pd.DataFrame, pd.DataFrame, list[str]]:
+        """Return onshore and offshore frames of selected criteria and offshore columns shown on hover."""
+        mask = np.isin(self.types, criteria)
+        rows, values = self.onshore.select(mask)
+        df = pd.DataFrame(
+            {"name": self.onshore.names[rows], self.unit: values, "hover_name": self.onshore.hover_names[rows]},
+        )
+
+        rows, _ = self.offshore.select(mask)
+        df_offshore = pd.DataFrame({"name": self.offshore.names[rows]})
+        columns = []
+        for criterion, label in OFFSHORE_HOVER_TYPES.items():
+            if criterion not in criteria or criterion not in self.types or self.unit not in OFFSHORE_HOVER_UNITS:
+                continue
+            column = np.searchsorted(self.types, criterion)
+            # like a pivot table, the column only exists if any selected offshore region has values of its type
+            if self.offshore.present[rows, column].any():
+                columns.append(f"{label} {OFFSHORE_HOVER_UNITS[self.unit]}")
+                df_offshore[columns[-1]] = self.offshore.values[rows, column]
+        df_offshore["hover_name"] = self.offshore.hover_names[rows]
+        df_offshore["offshore_color"] = "offshore"
+        return df, df_offshore, columns
+
+
+@versions.cache(
+    files=lambda scenario, spatial_res, requirement, year, unit: [
+        *data.get_resolution_files(requirement, spatial_res, [scenario]),
+        *regions.get_registry_files(spatial_res),
+    ],
+)
+def get_map_frames(scenario: str, spatial_res: str, requirement: str, year: int, unit: str) -> MapFrames:
+    """Build figure-ready values of all criteria once per process and data version, shared between callers."""
+    df = data.prepare_data(
+        scenario=scenario,
+        requirement=requirement,
+        year=year,
+        criteria=data.get_criteria(requirement),
+        spatial_res=spatial_res,
+    )
+    types = np.unique(df["type"].to_numpy())
+    registry = regions.get_registry(spatial_res)
+    onshore = df["onshore"].to_numpy()
+    return MapFrames(
+        unit=unit,
+        types=types,
+        onshore=LocationValues.from_frame(df[onshore], unit, types, registry.pretty_names, ONSHORE_HOVER_SUFFIX),
+        offshore=LocationValues.from_frame(
+            df[~onshore], unit, types, registry.offshore_pretty_names, OFFSHORE_HOVER_SUFFIX,
+        ),
+    )
+
+
+def blank_fig(text: str | None = None) -> go.Figure:
+    """Return empty figure, showing text if given."""
     fig = go.Figure(go.Scatter(x=[], y=[]))
     fig.update_layout(template=None,)
+    if text is not None:
+        fig.add_annotation(text=text, showarrow=False, font={"family": FONT, "color": FONT_COLOR, "size": 16})
     fig.update_xaxes(showgrid=False, showticklabels=False, zeroline=False)
     fig.update_yaxes(showgrid=False, showticklabels=False, zeroline=False)
     return fig
@@ -48,42 +170,50 @@ def get_choropleth(
         min_max: tuple[pd.DataFrame, pd.DataFrame],
         height: int,
         scenarios: str,
-        coloraxes: bool
+        coloraxes: bool,
+        geometry: bool = True,
 ) -> px.choropleth:
-    """Return choropleth for given user settings."""
-    title = f"{pretty_labels[data.get_sce_names()[scenario]]} ({year})"
-    df = data.prepare_data(
+    """
+    Return choropleth for given user settings.
+
+    If geometry is False, region shapes and country borders are left out,
+    which is sufficient to build partial updates of a displayed choropleth.
+    Only choropleths without geometry are cached, geometry is added on each call.
+    """
+    fig = get_choropleth_values(
         scenario=scenario,
+        spatial_res=spatial_res,
         requirement=requirement,
         year=year,
+        unit=unit,
         criteria=criteria,
+        min_max=min_max,
+        height=height,
+        scenarios=scenarios,
+        coloraxes=coloraxes,
     )
+    return add_geometry(fig, spatial_res) if geometry else fig
 
-    df_offshore_all = df[~df.onshore][["name", "type", "target_year", unit]]
-
-    df_offshore = pd.pivot_table(
-        df_offshore_all,
-        values=unit,
-        index=["name", "target_year"],
-        columns=["type"],
-        aggfunc=np.sum,
-    ).reset_index().fillna(0)
-
-    df = (
-        df[df.onshore][["name", "target_year", unit]]
-        .groupby(["name", "target_year"])
-        .sum()
-        .reset_index()
-    )
 
-    # add pretty name for hovering box
-    df["pretty_name"] = df["name"].replace(data.get_pretty_names())
-    df_offshore["pretty_name"] = df_offshore["name"].replace(data.get_pretty_names(True))
-    df_offshore["offshore_color"] = np.repeat("offshore", len(df_offshore))
-    geojson = data.get_regions(spatial_res)
-    geojson_offshore = data.get_regions_offshore(spatial_res)
-    geojson_country_shapes = data.get_country_shapes()
-    lons, lats = data.state_boundaries(geojson_country_shapes)
+@figure_cache.memoize(
+    sets=("criteria",),
+    files=lambda scenario, spatial_res, requirement, **_: data.get_map_files(requirement, spatial_res, [scenario]),
+)
+def get_choropleth_values(
+        scenario: str,
+        spatial_res: str,
+        requirement: str,
+        year: int,
+        unit: str,
+        criteria: list[str],
+        min_max: tuple[pd.DataFrame, pd.DataFrame],
+        height: int,
+        scenarios: str,
+        coloraxes: bool,
+) -> px.choropleth:
+    """Return choropleth for given user settings without region shapes and country borders."""
+    title = f"{pretty_labels[data.get_sce_names()[scenario]]} ({year})"
+    df, df_offshore, offshore_columns = get_map_frames(scenario, spatial_res, requirement, year, unit).select(criteria)
 
     # add color scale
     if requirement == "area":
@@ -93,57 +223,30 @@ def get_choropleth(
 
     fig = px.choropleth(
         df,
-        geojson=geojson,
         locations="name",
         color=unit,
         color_continuous_scale=scale,
         scope="europe",
         featureidkey="properties.name",
-        hover_name=df.pretty_name+" <br> <i>Click to show bar plot with more detailed information below.</i>",
+        hover_name="hover_name",
         hover_data={"name": False, unit: True},
         labels=pretty_labels,
         range_color=(min_max[0][unit], min_max[1][unit]),
         height=height
     )
 
-    hover_dict = {"name": False, "offshore_color": False}
-
-    if "Offshore wind" in criteria:
-        if unit == "rel":
-            hover_dict["Offshore wind area (in %)"] = True
-            df_offshore.rename(columns={"Offshore wind": "Offshore wind area (in %)"}, inplace=True)
-        elif unit == "area_km2":
-            hover_dict["Offshore wind area (in km²)"] = True
-            df_offshore.rename(columns={"Offshore wind": "Offshore wind area (in km²)"},
-                               inplace=True)
-        elif unit == "oly_field":
-            hover_dict["Offshore wind area (in Soccer Fields)"] = True
-            df_offshore.rename(columns={"Offshore wind": "Offshore wind area (in Soccer Fields)"},
-                               inplace=True)
-    if "Nature-protected area" in criteria:
-        if unit == "rel":
-            hover_dict["Nature-protected area (in %)"] = True
-            df_offshore.rename(columns={"Nature-protected area": "Nature-protected area (in %)"}, inplace=True)
-        elif unit == "area_km2":
-            hover_dict["Nature-protected area (in km²)"] = True
-            df_offshore.rename(columns={"Nature-protected area": "Nature-protected area (in km²)"},
-                               inplace=True)
-        elif unit == "oly_field":
-            hover_dict["Nature-protected area (in Soccer Fields)"] = True
-            df_offshore.rename(columns={"Nature-protected area": "Nature-protected area (in Soccer Fields)"},
-                               inplace=True)
+    hover_dict = {"name": False, "offshore_color": False, **dict.fromkeys(offshore_columns, True)}
 
     # for offshore regions
     fig2 = px.choropleth(
         df_offshore,
-        geojson=geojson_offshore,
         locations="name",
         color="offshore_color",
         color_discrete_map={
             "offshore": "white",
         },  # #8AC7DB as alternative blue offshore color
         featureidkey="properties.name",
-        hover_name=df_offshore.pretty_name + ":<br> <i>Click to show bar plot with more detailed information below.</i>",
+        hover_name="hover_name",
         hover_data=hover_dict,
         labels=pretty_labels,
         height=height
@@ -152,8 +255,8 @@ def get_choropleth(
     # for country borders
     fig3 = go.Figure(
         go.Scattergeo(
-            lon=lons,
-            lat=lats,
+            lon=[],
+            lat=[],
             mode="lines",
             line_width=1.5,
             line_color="#1f2120",  # can also set this to white or other if country borders should be different
@@ -212,25 +315,157 @@ def get_choropleth(
     return fig
 
 
+@figure_cache.memoize(
+    sets=("criteria",),
+    files=lambda scenario, spatial_res, requirement, **_: data.get_map_files(requirement, spatial_res, [scenario]),
+)
+def get_choropleth_animation(
+        scenario: str,
+        spatial_res: str,
+        requirement: str,
+        unit: str,
+        criteria: list[str],
+        min_max: tuple[pd.DataFrame, pd.DataFrame],
+        height: int,
+        scenarios: str,
+        coloraxes: bool,
+) -> go.Figure:
+    """
+    Return choropleth with one frame per target year, switched and played in the browser.
+
+    Geometry is only held by the traces of the first year, frames replace values and title.
+    The colour range given by min_max is shared by all frames, so it must span all years.
+    """
+    years = data.get_years()
+    kwargs = {
+        "scenario": scenario,
+        "spatial_res": spatial_res,
+        "requirement": requirement,
+        "unit": unit,
+        "criteria": criteria,
+        "min_max": min_max,
+        "height": height,
+        "scenarios": scenarios,
+        "coloraxes": coloraxes,
+    }
+    # geometry is added to a new figure, thus the cached one is not modified
+    fig = get_choropleth(**kwargs, year=years[0])
+    frames = []
+    for year in years:
+        frame = get_choropleth(**kwargs, year=year, geometry=False)
+        frames.append(
+            go.Frame(
+                name=str(year),
+                data=[
+                    {prop: value for prop, value in trace.to_plotly_json().items() if prop not in GEOMETRY_PROPERTIES}
+                    for trace in frame.data
+                ],
+                traces=list(range(len(frame.data))),
+                layout={"title": frame.layout.title.to_plotly_json()},
+            ),
+        )
+    fig.frames = frames
+
+    # geo traces are redrawn per frame, they do not support transitions
+    animation = {
+        "mode": "immediate",
+        "frame": {"duration": ANIMATION_FRAME_DURATION, "redraw": True},
+        "transition": {"duration": 0},
+    }
+    fig.update_layout(
+        margin={"b": 60},
+        updatemenus=[
+            {
+                "type": "buttons",
+                "direction": "left",
+                "showactive": False,
+                "x": 0,
+                "y": 0,
+                "xanchor": "left",
+                "yanchor": "top",
+                "buttons": [
+                    {"label": "▶", "method": "animate", "args": [None, {**animation, "fromcurrent": True}]},
+                    {"label": "❚❚", "method": "animate", "args": [[None], {**animation, "frame": {"duration": 0}}]},
+                ],
+            },
+        ],
+        sliders=[
+            {
+                "active": 0,
+                "x": 0.1,
+                "y": 0,
+                "len": 0.9,
+                "currentvalue": {"visible": False},
+                "steps": [
+                    {"label": str(year), "method": "animate", "args": [[str(year)], animation]}
+                    for year in years
+                ],
+            },
+        ],
+    )
+    return fig
+
+
+def add_geometry(fig: go.Figure, spatial_res: str) -> go.Figure:
+    """
+    Return copy of choropleth built without geometry with region shapes and country borders added.
+
+    Region shapes are referenced by url of their static asset, so browsers download and cache them once.
+    Simplified geometries matching the figure height are used, if built.
+    """
+    fig = go.Figure(fig)
+    height = fig.layout.height
+    choropleths = [trace for trace in fig.data if trace.type == "choropleth"]
+    for trace, url in zip(choropleths, data.get_regions_urls(spatial_res, height)):
+        trace.geojson = url
+    for trace in fig.data:
+        if trace.type == "scattergeo":
+            trace.lon, trace.lat = data.get_country_borders(height)
+    return fig
+
+
+def get_geometry_key(fig: go.Figure, spatial_res: str, scenarios: str) -> list[str]:
+    """Return key identifying geometry and layout of a choropleth."""
+    return [scenarios, spatial_res, *(trace.type for trace in fig.data)]
+
+
+def get_choropleth_patch(fig: go.Figure) -> Patch:
+    """Return partial update which replaces values of a displayed choropleth but keeps its geometry."""
+    patch = Patch()
+    for i, trace in enumerate(fig.data):
+        for prop, value in trace.to_plotly_json().items():
+            if prop not in GEOMETRY_PROPERTIES:
+                patch["data"][i][prop] = value
+    patch["layout"]["title"] = fig.layout.title.to_plotly_json()
+    patch["layout"]["coloraxis"] = fig.layout.coloraxis.to_plotly_json()
+    return patch
+
+
+@figure_cache.memoize(
+    sets=("criteria",),
+    files=lambda scenarios, requirement, spatial_res, **_: data.get_resolution_files(requirement, spatial_res, scenarios),
+)
 def get_bar_chart(  # noqa: PLR0913
     scenarios: list[str],
     requirement: str,
-    year: int,
+    year: int | None,
     unit: str,
     criteria: list[str],
     region: str,
+    spatial_res: str = resolutions.DEFAULT_RESOLUTION,
 ) -> go.Figure:
-    """Return bar chart for selected region."""
+    """Return bar chart for selected region, of all years if year is None."""
     df = pd.concat(
-        data.prepare_data(
+        data.get_region_requirements(
             scenario=scenario,
             requirement=requirement,
             year=year,
             criteria=criteria,
+            region=region,
+            spatial_res=spatial_res,
         )
         for scenario in scenarios
-    )
-    df = df[(df["name"] == region) & (df.onshore)]
+    ).sort_values(data.REGION_GROUP_KEYS, ignore_index=True)
 
     # add color palette for bar chart
     if requirement == "area":
@@ -245,8 +480,6 @@ def get_bar_chart(  # noqa: PLR0913
             "Nature-protected area": "#627732",
             "Urban & industrial area": "#adadad",
         }
-        df = df.groupby(["sce_name", "type", 'target_year', 'name']).agg(
-            {'area_km2': 'sum', 'oly_field': 'sum', 'rel': 'sum'}).reset_index()
     else:
         bar_palette = {
             "Biomass": "#a57f60",
@@ -258,8 +491,6 @@ def get_bar_chart(  # noqa: PLR0913
             "Hard coal": "#4c4c4c",
             "H2 production": "#7d5ba6",
         }
-        df = df.groupby(["sce_name", "type", 'target_year', 'name']).agg(
-            {'oly_pool': 'sum', 'water_miom3': 'sum'}).reset_index()
 
     fig = px.bar(
         df,
@@ -309,7 +540,7 @@ def get_bar_chart(  # noqa: PLR0913
     )
 
     fig.update_xaxes(
-        tickvals=[year],
+        tickvals=[year] if year is not None else data.get_years(),
         linecolor="lightgrey"
     )
 
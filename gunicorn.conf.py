@@ -0,0 +1,42 @@
+"""Gunicorn configuration, workers are set via WEB_CONCURRENCY."""
+import os
+
+bind = "0.0.0.0:80"
+timeout = 90
+# load app in master (see preload.py) and fork workers sharing its memory copy-on-write
+preload_app = os.environ.get("PRELOAD", "True") == "True"
+
+
+def on_starting(server: object) -> None:  # noqa: ARG001
+    """
+    Warm up figure cache once in the master if the app is not preloaded.
+
+    Workers read warmed up figures from the disk tier, which is thus required.
+    """
+    import settings
+
+    if settings.PRELOAD or not settings.CACHE_WARMUP:
+        return
+    import logging
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not settings.CACHE_DIR:
+        logging.warning("Skipping figure cache warm-up, it requires CACHE_DIR if the app is not preloaded.")
+        return
+    import warmup
+    from caching import figure_cache
+
+    warmup.warm_up()
+    # figures are shared via the disk tier, the master does not serve them
+    figure_cache.pop_memory_entries()
+
+
+def post_fork(server: object, worker: object) -> None:  # noqa: ARG001
+    """Watch data files for changes in each worker, as threads of the master are not forked."""
+    import settings
+
+    if settings.DATA_WATCH_INTERVAL > 0:
+        import preload
+        import versions
+
+        versions.watch(preload.rebuild)
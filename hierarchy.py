@@ -0,0 +1,117 @@
+"""Holds hierarchy of regions, countries and the EU and aggregation of region values along it."""
+import dataclasses
+import re
+import types
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+import regions
+import resolutions
+import versions
+
+REGION_LEVEL = resolutions.REGION_LEVEL
+COUNTRY_LEVEL = resolutions.COUNTRY_LEVEL
+EU_LEVEL = "eu"
+# clustered region codes start with their country code, e.g. "DE1 0"
+REGION_CODE = re.compile(r"^(?P<country>[A-Z]{2})\d+ \d+$")
+# ratio units are recomputed from summed numerator and denominator times factor on rollup
+RATIO_UNITS = {"rel": ("area_km2", "base_area", 100)}
+
+
+@dataclasses.dataclass(frozen=True)
+class Hierarchy:
+    """
+    Parent lookups from regions to countries and from countries to the EU.
+
+    Regions not listed in pretty names (e.g. of other clusterings) are assigned
+    to the country their code starts with.
+    """
+
+    countries: Mapping[str, str]
+    country_codes: frozenset[str]
+
+    def get_level(self, code: str) -> str | None:
+        """Return level of region code, None if unknown."""
+        if code == regions.EU:
+            return EU_LEVEL
+        if code in self.countries or REGION_CODE.match(code):
+            return REGION_LEVEL
+        if code in self.country_codes:
+            return COUNTRY_LEVEL
+        return None
+
+    def get_country(self, code: str) -> str:
+        """Return country of region code."""
+        if code in self.countries:
+            return self.countries[code]
+        return REGION_CODE.match(code)["country"]
+
+    def get_levels(self, buses: pd.Series | pd.Index) -> np.ndarray:
+        """Return level per bus, looking up each distinct code once."""
+        categorical = pd.Categorical(buses)
+        # missing values (code -1) map to the appended None
+        levels = np.array([*map(self.get_level, categorical.categories), None], dtype=object)
+        return levels[categorical.codes]
+
+    def get_groups(self, codes: list[str], level: str) -> dict[str, str]:
+        """Return group at given level per region code, e.g. its country."""
+        groups = {}
+        for code in codes:
+            if self.get_level(code) != REGION_LEVEL:
+                continue
+            if level == REGION_LEVEL:
+                groups[code] = code
+            elif level == COUNTRY_LEVEL:
+                groups[code] = self.get_country(code)
+            elif level == EU_LEVEL:
+                groups[code] = regions.EU
+        return groups
+
+
+@versions.cache(files=lambda: [regions.PRETTY_NAMES_FILENAME])
+def get_hierarchy() -> Hierarchy:
+    """Build hierarchy from region registry once per process and data version."""
+    registry = regions.get_registry()
+    return Hierarchy(
+        countries=types.MappingProxyType(dict(registry.countries)),
+        country_codes=frozenset(code for code in registry.members if code != regions.EU),
+    )
+
+
+def rollup(
+    df: pd.DataFrame,
+    groups: Mapping[str, str],
+    keys: list[str],
+    units: list[str],
+) -> pd.DataFrame:
+    """
+    Aggregate rows of regions into groups, returned in column "bus".
+
+    Groups map region codes to group names, e.g. countries from Hierarchy.get_groups
+    or any user-defined grouping. Rows of regions not in groups are left out.
+    Units are summed, ratio units are recomputed from their summed parts or NaN if parts are missing.
+    """
+    ratio_parts = {
+        unit: RATIO_UNITS[unit]
+        for unit in units
+        if unit in RATIO_UNITS and {*RATIO_UNITS[unit][:2]} <= {*df.columns}
+    }
+    summed = list(dict.fromkeys(
+        [unit for unit in units if unit not in RATIO_UNITS]
+        + [part for numerator, denominator, _ in ratio_parts.values() for part in (numerator, denominator)],
+    ))
+    # mapping a categorical maps its categories only
+    grouped = (
+        df.assign(bus=df["bus"].astype("category").map(groups))
+        .groupby([*keys, "bus"], observed=True)[summed]
+        .sum()
+    )
+    for unit in units:
+        if unit in ratio_parts:
+            numerator, denominator, factor = ratio_parts[unit]
+            grouped[unit] = grouped[numerator] / grouped[denominator] * factor
+        elif unit in RATIO_UNITS:
+            grouped[unit] = np.nan
+    return grouped[units].reset_index()
@@ -4,6 +4,8 @@ import dash_bootstrap_components as dbc
 from dash import dcc, html
 
 import data
+import regions
+import resolutions
 
 pretty_names = data.get_sce_pretty_names()
 scenario_options = data.get_scenarios()
@@ -101,6 +103,8 @@ year = html.Div(
             marks={year: str(year) for year in year_options},
             value=year_options[0],
         ),
+        # animated maps hold all years, switched and played in the browser
+        dbc.Switch(id="animate", label="Animate all years", value=False),
     ],
     style={"margin-bottom": "10px", "margin-top": "10px"},
 )
@@ -110,10 +114,10 @@ spatial_res = html.Div(
         dbc.RadioItems(
             id="spatial_res",
             options=[
-                {"label": "Region", "value": "region"},
-                {"label": "Country", "value": "country"},
+                {"label": resolution.label, "value": name}
+                for name, resolution in resolutions.RESOLUTIONS.items()
             ],
-            value="region",
+            value=resolutions.DEFAULT_RESOLUTION,
         ),
     ],
     style={"margin-bottom": "10px"},
@@ -147,11 +151,7 @@ unit = html.Div(
     ],
 )
 
-reg_opts = sorted([x for x in list(set(data.get_pretty_names().values()))
-                   if "offshore" not in x])
-reg_opts.insert(0, reg_opts.pop(reg_opts.index("European Union")))
-
-reg_opts = [" ".join(["-", option]) if "," in option else option for option in reg_opts]
+reg_opts = list(regions.get_registry().dropdown_options)
 
 region_res = dbc.Tab(
             tab_id="region_tab",
@@ -198,6 +198,7 @@ atlas = dbc.Row(
             id="col_choropleth_1",
             children=[
                 dcc.Graph(id="choropleth_1", style={"width": "100%"}),
+                dcc.Store(id="choropleth_1_geometry"),
             ],
         ),
         dbc.Col(
@@ -208,6 +209,7 @@ atlas = dbc.Row(
                     style={"width": "100%"},
                     config={"displayModeBar": False},
                 ),
+                dcc.Store(id="choropleth_2_geometry"),
             ],
         ),
     ],
@@ -217,8 +219,26 @@ controls = html.Section(
     children=[scenario, year, spatial_res, requirements, unit, criteria],
 )
 
+# lookup tables of clientside callbacks, serialized into the page once
+registries = {name: regions.get_registry(name) for name in resolutions.RESOLUTIONS}
+lookups = dcc.Store(
+    id="lookups",
+    data={
+        "scenarios": [pretty_names[x] for x in scenario_options],
+        "scenario_markdown": {name: convert_to_markdown(text) for name, text in scenario_description.items()},
+        # region codes are reused by resolutions for different areas, thus labels and options are per resolution
+        "region_labels": {
+            name: {code: registry.get_dropdown_label(code) for code in registry.pretty_names}
+            for name, registry in registries.items()
+        },
+        "region_options": {name: list(registry.dropdown_options) for name, registry in registries.items()},
+        "resolution_scenarios": {name: data.get_resolution_scenarios(name) for name in resolutions.RESOLUTIONS},
+    },
+)
+
 DEFAULT_LAYOUT = dbc.Container(
     [
+        lookups,
         # row with choropleth map
         dbc.Row(
             [
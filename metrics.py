@@ -0,0 +1,200 @@
+"""Holds in-process metrics of dash callbacks, data loading and caches in Prometheus text format."""
+import bisect
+import collections
+import threading
+import time
+from collections.abc import Callable
+
+import flask
+
+from caching import figure_cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DASH_UPDATE_PATH = "_dash-update-component"
+# upper bounds (in s) of callback latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# upper bounds (in bytes) of callback payload histogram buckets
+PAYLOAD_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6)
+
+DESCRIPTIONS = {
+    "rgi_callback_requests_total": ("counter", "Dash callback requests."),
+    "rgi_callback_errors_total": ("counter", "Dash callback requests failing with a server error."),
+    "rgi_callback_latency_seconds": ("histogram", "Dash callback latency."),
+    "rgi_callback_payload_bytes": ("histogram", "Dash callback response size."),
+    "rgi_response_compression_ratio": ("histogram", "Ratio of uncompressed to compressed json response size."),
+    "rgi_data_loads_total": ("counter", "Files parsed or memory-mapped by the data layer."),
+    "rgi_exports_total": ("counter", "Data exports sent, revalidated ones excluded."),
+    "rgi_export_rows_total": ("counter", "Rows sent by data exports."),
+    "rgi_figure_cache_events_total": ("counter", "Figure cache hits, misses and evictions."),
+    "rgi_figure_cache_entries": ("gauge", "Entries in memory tier of figure cache."),
+    "rgi_figure_cache_bytes": ("gauge", "Size of memory tier of figure cache."),
+    "rgi_data_reloads_total": ("counter", "Data versions built and swapped in after data files changed."),
+    "rgi_preload_seconds": ("gauge", "Duration of preload phases in gunicorn master."),
+    "rgi_preload_rss_bytes": ("gauge", "Resident memory of gunicorn master after preload phases."),
+    "rgi_shared_memory_bytes": ("gauge", "Size of shared memory segments holding tables and country borders."),
+    "rgi_resolution_memory_bytes": ("gauge", "Size of loaded tables and geojson files per spatial resolution."),
+}
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Init empty buckets."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add value to its bucket."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def get_samples(self) -> list[tuple[str, str, float]]:
+        """Return cumulative bucket counts, sum and count as (suffix, le, value) tuples."""
+        samples = []
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            samples.append(("_bucket", f"{bound:g}" if bound != "+Inf" else bound, cumulative))
+        samples.append(("_sum", None, self.sum))
+        samples.append(("_count", None, cumulative))
+        return samples
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and histograms of one process.
+
+    Metrics are kept per process, i.e. each gunicorn worker reports its own values.
+    """
+
+    def __init__(self) -> None:
+        """Init empty registry."""
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._histograms = {}
+        self._collectors = []
+
+    def add_collector(self, collector: Callable[[], list[tuple[str, tuple, float]]]) -> None:
+        """Add function returning (name, labels, value) samples read at scrape time."""
+        self._collectors.append(collector)
+
+    def inc(self, name: str, labels: dict[str, str] | None = None, value: float = 1) -> None:
+        """Increase counter by value."""
+        with self._lock:
+            self._counters[(name, tuple(sorted((labels or {}).items())))] += value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...],
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        """Add value to histogram."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+            self._histograms[key].observe(value)
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text format."""
+        samples = collections.defaultdict(list)
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples[name].append((name, labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                for suffix, le, value in histogram.get_samples():
+                    sample_labels = (*labels, ("le", le)) if le is not None else labels
+                    samples[name].append((name + suffix, sample_labels, value))
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                samples[name].append((name, labels, value))
+
+        lines = []
+        for name in sorted(samples):
+            metric_type, description = DESCRIPTIONS.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples[name]:
+                lines.append(f"{sample_name}{format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    """Return labels in Prometheus text format."""
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def get_cache_samples() -> list[tuple[str, tuple, float]]:
+    """Return current figure cache statistics as samples."""
+    stats = figure_cache.get_stats()
+    samples = [
+        ("rgi_figure_cache_events_total", (("event", event),), stats[event])
+        for event in ("memory_hits", "disk_hits", "misses", "memory_evictions", "disk_evictions")
+    ]
+    samples.append(("rgi_figure_cache_entries", (), stats["memory_entries"]))
+    samples.append(("rgi_figure_cache_bytes", (), stats["memory_bytes"]))
+    return samples
+
+
+def get_callback_name(app: object, output: str | None) -> str:
+    """Return name of callback function registered for output id of a dash update request."""
+    callback = app.callback_map.get(output, {}).get("callback")
+    return callback.__name__ if callback is not None else "unknown"
+
+
+def instrument(app: object) -> None:
+    """Record callback metrics of dash app and expose all metrics at /metrics."""
+    server = app.server
+
+    def is_callback_request() -> bool:
+        return flask.request.path.endswith(DASH_UPDATE_PATH)
+
+    @server.before_request
+    def start_timer() -> None:
+        if is_callback_request():
+            flask.g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_callback(response: flask.Response) -> flask.Response:
+        if is_callback_request() and "metrics_start" in flask.g:
+            record(response.status_code, response.calculate_content_length() or 0)
+        return response
+
+    @server.teardown_request
+    def record_callback_error(exception: BaseException | None) -> None:
+        # unhandled exceptions skip after_request hooks
+        if exception is not None and is_callback_request() and "metrics_start" in flask.g:
+            record(500, 0)
+
+    def record(status: int, size: int) -> None:
+        body = flask.request.get_json(silent=True) or {}
+        labels = {"callback": get_callback_name(app, body.get("output"))}
+        # used to label compression ratio of the response
+        flask.g.metrics_callback = labels["callback"]
+        registry.inc("rgi_callback_requests_total", labels)
+        registry.observe(
+            "rgi_callback_latency_seconds", time.perf_counter() - flask.g.pop("metrics_start"), LATENCY_BUCKETS, labels,
+        )
+        # 204 responses are sent if a callback prevents its update
+        if status < 500:  # noqa: PLR2004
+            registry.observe("rgi_callback_payload_bytes", size, PAYLOAD_BUCKETS, labels)
+        else:
+            registry.inc("rgi_callback_errors_total", labels)
+
+    @server.route("/metrics")
+    def metrics() -> flask.Response:
+        return flask.Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+registry = Metrics()
+registry.add_collector(get_cache_samples)
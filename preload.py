@@ -0,0 +1,172 @@
+"""Holds preloading of shared application state in the gunicorn master before workers are forked."""
+import gc
+import logging
+import pathlib
+import resource
+import time
+from collections.abc import Callable
+
+import metrics
+import settings
+
+STATM_PATH = pathlib.Path("/proc/self/statm")
+
+# duration (in s) and resident memory (in bytes) after each preload phase
+report = {}
+
+
+def get_rss() -> int:
+    """Return resident memory of current process, peak resident memory if current one is unavailable."""
+    try:
+        return int(STATM_PATH.read_text().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def share_data() -> None:
+    """Place scenario tables and country borders in shared memory segments."""
+    import data
+    import shared
+
+    data.share_data()
+    metrics.registry.add_collector(shared.get_size_samples)
+
+
+def load_tables() -> None:
+    """Load scenario tables of all resolutions."""
+    import data
+    import resolutions
+
+    for resolution in resolutions.RESOLUTIONS.values():
+        data.get_scenario_store(resolution.table_dir)
+
+
+def load_lookups() -> None:
+    """Build region registries of all resolutions, hierarchy and option lists."""
+    import data
+    import hierarchy
+    import regions
+    import resolutions
+
+    for spatial_res in resolutions.RESOLUTIONS:
+        regions.get_registry(spatial_res)
+    hierarchy.get_hierarchy()
+    data.get_years()
+    for requirement in data.requirement_units:
+        data.get_criteria(requirement)
+
+
+def load_geometries() -> None:
+    """Publish region geometries and load country borders for all resolutions and map heights."""
+    import data
+    import resolutions
+
+    for height in settings.MAP_HEIGHTS:
+        for name in resolutions.RESOLUTIONS:
+            data.get_regions_urls(name, height)
+        data.get_country_borders(height)
+
+
+def load_colour_ranges() -> None:
+    """Pre-aggregate colour range cubes of all resolutions."""
+    import data
+    import resolutions
+
+    for name in resolutions.RESOLUTIONS:
+        for requirement in data.requirement_units:
+            data.get_colour_range_cube(requirement, name)
+
+
+def load_region_indexes() -> None:
+    """Build region indexes of bar charts for all scenarios and resolutions."""
+    import data
+    import resolutions
+
+    for name in resolutions.RESOLUTIONS:
+        for scenario in data.sce_names:
+            for requirement in data.requirement_units:
+                data.get_region_index(scenario, requirement, name)
+
+
+def load_map_frames() -> None:
+    """Build figure-ready values of choropleths for all scenarios, years, units and resolutions."""
+    import data
+    import graphs
+    import resolutions
+
+    for name in resolutions.RESOLUTIONS:
+        for scenario in data.sce_names:
+            for year in data.get_years():
+                for requirement, units in data.requirement_units.items():
+                    for unit in units:
+                        graphs.get_map_frames(scenario, name, requirement, year, unit)
+
+
+def load_app() -> None:
+    """Import dash app, building its layout."""
+    import app  # noqa: F401
+
+
+def warm_up() -> None:
+    """Pre-render common figures into the figure cache."""
+    import warmup
+
+    warmup.warm_up()
+
+
+# phases building data structures, also run in background on data reload
+DATA_PHASES = [
+    ("tables", load_tables),
+    ("lookups", load_lookups),
+    ("geometries", load_geometries),
+    ("colour ranges", load_colour_ranges),
+    ("region indexes", load_region_indexes),
+    ("map frames", load_map_frames),
+]
+
+
+def rebuild() -> None:
+    """Build data structures of a changed data version, structures of unchanged files are reused."""
+    for _, phase in DATA_PHASES:
+        phase()
+
+
+def run_phase(name: str, phase: Callable[[], None]) -> None:
+    """Run preload phase and record its duration and resident memory afterwards."""
+    start = time.perf_counter()
+    phase()
+    report[name] = {"seconds": time.perf_counter() - start, "rss_bytes": get_rss()}
+    logging.info(f"Preloaded {name} in {report[name]['seconds']:.2f} s, RSS {report[name]['rss_bytes'] / 1024**2:.0f} MiB.")
+
+
+def get_report_samples() -> list[tuple[str, tuple, float]]:
+    """Return preload report as metric samples."""
+    return [
+        (f"rgi_preload_{key}", (("phase", phase),), value)
+        for phase, values in report.items()
+        for key, value in values.items()
+    ]
+
+
+def preload() -> None:
+    """
+    Build all data, geometry and lookup structures once, to be shared copy-on-write by forked workers.
+
+    Garbage collection is disabled while loading and all objects created are frozen afterwards,
+    so collections in workers neither traverse nor write to the shared pages.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    gc.disable()
+    phases = [("shared memory", share_data)] if settings.SHARED_MEMORY else []
+    phases += [*DATA_PHASES, ("app", load_app)]
+    if settings.CACHE_WARMUP:
+        phases.append(("figure cache", warm_up))
+    for name, phase in phases:
+        run_phase(name, phase)
+    gc.freeze()
+    gc.enable()
+    metrics.registry.add_collector(get_report_samples)
+    logging.info(
+        f"Preloaded {len(report)} phases in {sum(values['seconds'] for values in report.values()):.2f} s, "
+        f"{gc.get_freeze_count()} objects frozen.",
+    )
@@ -0,0 +1,117 @@
+"""Holds registry of region names and memberships."""
+import collections
+import dataclasses
+import json
+import types
+from collections.abc import Mapping
+
+import pandas as pd
+
+import resolutions
+import settings
+import versions
+
+PRETTY_NAMES_FILENAME = "pretty_names.csv"
+EU = "EU"
+# prefix of sub-national regions in region drop down
+DROPDOWN_PREFIX = "- "
+
+
+@dataclasses.dataclass(frozen=True)
+class RegionRegistry:
+    """Immutable lookups between region codes, pretty names and countries."""
+
+    pretty_names: Mapping[str, str]
+    offshore_pretty_names: Mapping[str, str]
+    codes: Mapping[str, str]
+    countries: Mapping[str, str]
+    members: Mapping[str, tuple[str, ...]]
+    dropdown_options: tuple[str, ...]
+
+    def get_pretty_name(self, code: str, offshore: bool = False) -> str:  # noqa: FBT001, FBT002
+        """Return pretty name of region code, or the code itself if unknown."""
+        return (self.offshore_pretty_names if offshore else self.pretty_names).get(code, code)
+
+    def get_code(self, pretty_name: str) -> str:
+        """Return region code of pretty name, also accepting drop down labels."""
+        return self.codes[pretty_name.removeprefix(DROPDOWN_PREFIX)]
+
+    def get_dropdown_label(self, code: str) -> str:
+        """Return label of region code as used in region drop down."""
+        pretty_name = self.pretty_names[code]
+        return DROPDOWN_PREFIX + pretty_name if "," in pretty_name else pretty_name
+
+
+def get_registry_files(spatial_res: str = resolutions.DEFAULT_RESOLUTION) -> list[str]:
+    """Return names of data files region names of a resolution are read from."""
+    resolution = resolutions.get_resolution(spatial_res)
+    if resolution.region_names is not None:
+        return list(dict.fromkeys([PRETTY_NAMES_FILENAME, resolution.region_names]))
+    return [PRETTY_NAMES_FILENAME, *resolution.geojsons]
+
+
+def read_region_names(spatial_res: str) -> pd.DataFrame:
+    """
+    Return pretty names of the region codes of a resolution, the countries and the EU.
+
+    Regions of resolutions without pretty names are named by their country and code, e.g. "Germany, DE1 0",
+    regions of countries with a single region by their country only, as in pretty names.
+    """
+    resolution = resolutions.get_resolution(spatial_res)
+    if resolution.region_names is not None:
+        return pd.read_csv(settings.DATA_DIR / resolution.region_names, index_col=0)
+    df = pd.read_csv(settings.DATA_DIR / PRETTY_NAMES_FILENAME, index_col=0)
+    countries = df.loc[df["name"] == df["country"]]
+    country_names = dict(zip(countries["country"], countries["country_name"]))
+    codes = set()
+    for filename in resolution.geojsons:
+        with (settings.DATA_DIR / filename).open("r", encoding="utf-8") as geojsonfile:
+            codes.update(feature["properties"]["name"] for feature in json.load(geojsonfile)["features"])
+    codes = sorted(codes)
+    # region codes start with their country code
+    region_countries = [code[:2] for code in codes]
+    region_counts = collections.Counter(region_countries)
+    regions_df = pd.DataFrame(
+        {
+            "name": codes,
+            "country": region_countries,
+            "boolean": [region_counts[country] > 1 for country in region_countries],
+            "country_name": [country_names.get(country, country) for country in region_countries],
+            "Name": codes,
+        },
+    )
+    return pd.concat([regions_df, countries], ignore_index=True)
+
+
+@versions.cache(files=lambda spatial_res=resolutions.DEFAULT_RESOLUTION: get_registry_files(spatial_res))
+def get_registry(spatial_res: str = resolutions.DEFAULT_RESOLUTION) -> RegionRegistry:
+    """Build region registry of a resolution once per process and data version."""
+    df = read_region_names(spatial_res)
+    pretty_names = {}
+    offshore_pretty_names = {}
+    codes = {}
+    countries = {}
+    members = {}
+    for row in df.itertuples(index=False):
+        parts = [row.country_name, row.Name] if row.boolean else [row.country_name]
+        pretty_names[row.name] = ", ".join(parts)
+        offshore_pretty_names[row.name] = ", ".join([*parts, "Offshore "])
+        # first code wins, e.g. single-region countries resolve to their region
+        codes.setdefault(pretty_names[row.name], row.name)
+        if row.name != row.country:
+            countries[row.name] = row.country
+            members.setdefault(row.country, []).append(row.name)
+    members[EU] = [country for country in members if country != EU]
+
+    dropdown_options = sorted(set(pretty_names.values()))
+    dropdown_options.insert(0, dropdown_options.pop(dropdown_options.index(pretty_names[EU])))
+    return RegionRegistry(
+        pretty_names=types.MappingProxyType(pretty_names),
+        offshore_pretty_names=types.MappingProxyType(offshore_pretty_names),
+        codes=types.MappingProxyType(codes),
+        countries=types.MappingProxyType(countries),
+        members=types.MappingProxyType({country: tuple(regions) for country, regions in members.items()}),
+        dropdown_options=tuple(
+            DROPDOWN_PREFIX + option if "," in option else option for option in dropdown_options
+        ),
+    )
@@ -0,0 +1,74 @@
+"""Holds registry of spatial resolutions with their scenario tables and geometries."""
+import dataclasses
+import pathlib
+import types
+
+import settings
+
+# bus level of tables shown at a resolution
+REGION_LEVEL = "region"
+COUNTRY_LEVEL = "country"
+
+
+@dataclasses.dataclass(frozen=True)
+class Resolution:
+    """
+    Spatial resolution selectable in the app.
+
+    Scenario tables are read from table_dir, geojson filenames are relative to the data directory.
+    Resolutions sharing a table directory share its loaded tables.
+    Region codes are named by the pretty names file region_names, if given, since clusterings
+    of different resolutions reuse the same codes for different areas.
+    """
+
+    name: str
+    label: str
+    table_dir: pathlib.Path
+    onshore_geojson: str
+    offshore_geojson: str
+    level: str = REGION_LEVEL
+    region_names: str | None = None
+
+    @property
+    def geojsons(self) -> tuple[str, str]:
+        """Return filenames of onshore and offshore geometries."""
+        return self.onshore_geojson, self.offshore_geojson
+
+
+RESOLUTIONS = types.MappingProxyType(
+    {
+        resolution.name: resolution
+        for resolution in [
+            Resolution(
+                name="region",
+                label="Region",
+                table_dir=settings.DATA_DIR,
+                onshore_geojson="regions_onshore_elec_s_50.geojson",
+                offshore_geojson="regions_offshore_elec_s_50.geojson",
+                region_names="pretty_names.csv",
+            ),
+            Resolution(
+                name="country",
+                label="Country",
+                table_dir=settings.DATA_DIR,
+                onshore_geojson="countries_onshore_elec_s_50.geojson",
+                offshore_geojson="countries_offshore_elec_s_50.geojson",
+                level=COUNTRY_LEVEL,
+                region_names="pretty_names.csv",
+            ),
+            Resolution(
+                name="region_106",
+                label="Region (106 clusters)",
+                table_dir=settings.DATA_DIR / "106-regions-data",
+                onshore_geojson="106-regions-data/regions_onshore_elec_s_106.geojson",
+                offshore_geojson="106-regions-data/regions_offshore_elec_s_106.geojson",
+            ),
+        ]
+    },
+)
+DEFAULT_RESOLUTION = "region"
+
+
+def get_resolution(name: str) -> Resolution:
+    """Return resolution by name."""
+    return RESOLUTIONS[name]
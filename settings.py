@@ -13,3 +13,41 @@ if not SECRET_KEY:
 
 ROOT_DIR = pathlib.Path(__file__).parent
 DATA_DIR = ROOT_DIR / "data"
+BUILD_DIR = ROOT_DIR / "build"
+GEOMETRY_BUILD_DIR = BUILD_DIR / "geometry"
+TABLES_BUILD_DIR = BUILD_DIR / "tables"
+ASSETS_BUILD_DIR = BUILD_DIR / "assets"
+# static export of common figures with a static-only front end, see static.py
+STATIC_BUILD_DIR = BUILD_DIR / "static"
+
+# heights (in px) of displayed maps, simplified geometries are built for each
+MAP_HEIGHTS = [800, 600]
+
+# figure cache with an in-process tier capped in bytes and a disk tier shared
+# between workers, an empty CACHE_DIR disables the disk tier
+CACHE_MEMORY_BYTES = int(os.environ.get("CACHE_MEMORY_BYTES", 256 * 1024**2))
+CACHE_DIR = os.environ.get("CACHE_DIR", str(ROOT_DIR / "cache-directory"))
+CACHE_DISK_THRESHOLD = int(os.environ.get("CACHE_DISK_THRESHOLD", 2000))
+
+# threads rendering the two maps of comparison view concurrently, 1 renders them one after the other
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", 2))
+
+# build shared state in the gunicorn master once before forking workers, see gunicorn.conf.py
+PRELOAD = os.environ.get("PRELOAD", "True") == "True"
+# on preload, place tables and country borders in named shared memory segments attached by all workers
+SHARED_MEMORY = os.environ.get("SHARED_MEMORY", "True") == "True"
+
+# poll data files every DATA_WATCH_INTERVAL seconds in each gunicorn worker and reload changed ones
+# in background, 0 disables watching
+DATA_WATCH_INTERVAL = float(os.environ.get("DATA_WATCH_INTERVAL", 30))
+
+# pre-render common figures into the figure cache at server start
+CACHE_WARMUP = os.environ.get("CACHE_WARMUP", "False") == "True"
+WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", os.cpu_count() or 1))
+
+# compress json responses (e.g. callback payloads) larger than COMPRESSION_MIN_BYTES,
+# brotli is used if installed and accepted by the client
+COMPRESS_RESPONSES = os.environ.get("COMPRESS_RESPONSES", "True") == "True"
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
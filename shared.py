@@ -0,0 +1,107 @@
+"""Holds named shared memory segments of table columns and coordinate arrays shared by all workers."""
+import atexit
+import logging
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# column offsets within a segment are aligned to this many bytes
+ALIGNMENT = 64
+
+# descriptors of shared arrays by key, created in the gunicorn master and inherited by forked workers
+descriptors = {}
+# segments opened by this process, kept open as long as views on them exist
+_segments = {}
+
+
+def share(key: str, columns: dict[str, np.ndarray | pd.Categorical]) -> dict:
+    """
+    Copy columns into a new named shared memory segment and return its descriptor.
+
+    Categorical columns are stored as codes, their categories are kept in the descriptor.
+    """
+    arrays = {}
+    described = []
+    offset = 0
+    for name, values in columns.items():
+        column = {"name": name}
+        if isinstance(values, pd.Categorical):
+            column["categories"] = values.categories.tolist()
+            values = values.codes  # noqa: PLW2901
+        array = np.ascontiguousarray(values)
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        column.update({"dtype": array.dtype.str, "offset": offset, "length": len(array)})
+        arrays[name] = array
+        described.append(column)
+        offset += array.nbytes
+    segment = shared_memory.SharedMemory(name=f"rgi_{os.getpid()}_{len(descriptors)}", create=True, size=max(offset, 1))
+    for column in described:
+        array = arrays[column["name"]]
+        np.ndarray(array.shape, array.dtype, buffer=segment.buf, offset=column["offset"])[:] = array
+    _segments[segment.name] = segment
+    descriptors[key] = {"segment": segment.name, "size": segment.size, "columns": described}
+    return descriptors[key]
+
+
+def attach(key: str) -> dict[str, np.ndarray | pd.Categorical] | None:
+    """Return read-only zero-copy views on shared columns of key, None if key is not shared."""
+    descriptor = descriptors.get(key)
+    if descriptor is None:
+        return None
+    if descriptor["segment"] not in _segments:
+        _segments[descriptor["segment"]] = shared_memory.SharedMemory(name=descriptor["segment"])
+    buffer = _segments[descriptor["segment"]].buf
+    columns = {}
+    for column in descriptor["columns"]:
+        values = np.ndarray(column["length"], np.dtype(column["dtype"]), buffer=buffer, offset=column["offset"])
+        values.flags.writeable = False
+        if "categories" in column:
+            values = pd.Categorical.from_codes(values, categories=column["categories"])
+        columns[column["name"]] = values
+    return columns
+
+
+def share_frame(key: str, df: pd.DataFrame) -> None:
+    """Share all columns of dataframe."""
+    share(
+        key,
+        {
+            name: column.array if isinstance(column.dtype, pd.CategoricalDtype) else column.to_numpy()
+            for name, column in df.items()
+        },
+    )
+
+
+def attach_frame(key: str) -> pd.DataFrame | None:
+    """Return dataframe on shared columns of key, None if key is not shared."""
+    columns = attach(key)
+    # copy=False keeps columns in shared memory instead of consolidating them
+    return pd.DataFrame(columns, copy=False) if columns is not None else None
+
+
+def get_size() -> int:
+    """Return total size of shared segments."""
+    return sum(descriptor["size"] for descriptor in descriptors.values())
+
+
+def get_size_samples() -> list[tuple[str, tuple, float]]:
+    """Return size of shared segments as metric samples."""
+    return [("rgi_shared_memory_bytes", (), get_size())]
+
+
+def unlink_all(owner: int) -> None:
+    """Remove shared segments when their creating process exits, forked workers keep them."""
+    if os.getpid() != owner:
+        return
+    # segments are not closed, as views on them may still exist
+    for segment in _segments.values():
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            logging.warning(f"Shared memory segment {segment.name} was already removed.")
+    descriptors.clear()
+
+
+atexit.register(unlink_all, os.getpid())
@@ -0,0 +1,228 @@
+"""Holds export of common figures as static files, served by a static-only front end without the dash app."""
+import concurrent.futures
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import pathlib
+import shutil
+import time
+
+import plotly
+from plotly import graph_objects as go
+
+import data
+import geometry
+import graphs
+import regions
+import resolutions
+import settings
+import warmup
+from caching import figure_cache
+
+FRONTEND_DIR = settings.ROOT_DIR / "frontend"
+PLOTLY_JS = pathlib.Path(plotly.__file__).parent / "package_data" / "plotly.min.js"
+MANIFEST_FILENAME = "manifest.json"
+FIGURES_DIR = "figures"
+GEOMETRY_DIR = "geometry"
+FIGURE_HASH_LENGTH = 16
+# criteria set selecting all criteria of a requirement, other sets hold a single criterion
+ALL_CRITERIA = "all"
+REQUIREMENT_LABELS = {"area": "Area", "water": "Water"}
+
+
+def get_figure_key(*parts: object) -> str:
+    """Return key of figure in manifest, built the same way by the front end."""
+    return "/".join(map(str, parts))
+
+
+def get_criteria_sets(requirement: str, single_criteria: bool) -> dict[str, list[str]]:  # noqa: FBT001
+    """Return exported criteria sets by name, all criteria and optionally each single criterion."""
+    criteria = data.get_criteria(requirement)
+    criteria_sets = {ALL_CRITERIA: criteria}
+    if single_criteria:
+        criteria_sets.update({criterion: [criterion] for criterion in criteria})
+    return criteria_sets
+
+
+def get_table_resolution(spatial_res: str) -> str:
+    """Return first resolution sharing the scenario tables of given one, their bar charts are identical."""
+    table_dir = resolutions.get_resolution(spatial_res).table_dir
+    return next(name for name, resolution in resolutions.RESOLUTIONS.items() if resolution.table_dir == table_dir)
+
+
+def get_regions(scenario: str, requirement: str, spatial_res: str) -> list[str]:
+    """Return codes of regions selectable in region drop down or by clicking a map."""
+    registry = regions.get_registry(spatial_res)
+    codes = [registry.get_code(option) for option in registry.dropdown_options]
+    _, ranges = data.get_region_index(scenario, requirement, spatial_res)
+    return list(dict.fromkeys([*codes, *ranges]))
+
+
+def get_tasks(single_criteria: bool) -> dict[str, tuple[str, dict, list[str]]]:  # noqa: FBT001
+    """
+    Return figures of single scenario view by render key as graphs function name, its arguments and figure keys.
+
+    Figures shared by several keys, e.g. bar charts of resolutions with the same tables, are rendered once.
+    """
+    import app
+
+    tasks = {}
+    for requirement, units in data.requirement_units.items():
+        combinations = itertools.product(
+            get_criteria_sets(requirement, single_criteria).items(),
+            data.get_sce_names().items(),
+            data.get_years(),
+            warmup.SPATIAL_RESOLUTIONS,
+        )
+        for (criteria_name, criteria), (scenario, short_name), year, spatial_res in combinations:
+            min_max = app.get_min_max(requirement, criteria, "scenario_single", scenario, spatial_res=spatial_res)
+            table_res = get_table_resolution(spatial_res)
+            region_codes = get_regions(scenario, requirement, spatial_res)
+            for unit in units:
+                parts = (short_name, year, requirement, unit, criteria_name)
+                key = get_figure_key("choropleth", spatial_res, *parts)
+                tasks[key] = (
+                    "get_choropleth",
+                    {
+                        "scenario": scenario,
+                        "spatial_res": spatial_res,
+                        "requirement": requirement,
+                        "year": year,
+                        "unit": unit,
+                        "criteria": criteria,
+                        "min_max": min_max,
+                        "height": warmup.MAP_HEIGHT,
+                        "scenarios": "scenario_single",
+                        "coloraxes": True,
+                    },
+                    [key],
+                )
+                for region in region_codes:
+                    render_key = get_figure_key("bar_chart", table_res, *parts, region)
+                    if render_key not in tasks:
+                        tasks[render_key] = (
+                            "get_bar_chart",
+                            {
+                                "scenarios": [scenario],
+                                "requirement": requirement,
+                                "year": year,
+                                "unit": unit,
+                                "criteria": criteria,
+                                "region": region,
+                                "spatial_res": table_res,
+                            },
+                            [],
+                        )
+                    tasks[render_key][2].append(get_figure_key("bar_chart", spatial_res, *parts, region))
+    return tasks
+
+
+def render(task: tuple[str, dict, pathlib.Path]) -> str:
+    """
+    Render figure of task into a gzip compressed json file named by its content hash.
+
+    Returns path of the file relative to the output directory.
+    Geometry assets are referenced relative to the front end, so the export can be served from any path.
+    """
+    name, kwargs, output_dir = task
+    fig = go.Figure(getattr(graphs, name)(**kwargs))
+    # entries are not stored, keep memory of workers flat
+    figure_cache.pop_memory_entries()
+    for trace in fig.data:
+        if isinstance(getattr(trace, "geojson", None), str):
+            trace.geojson = trace.geojson.removeprefix("/")
+    content = fig.to_json().encode("utf-8")
+    path = f"{FIGURES_DIR}/{hashlib.sha256(content).hexdigest()[:FIGURE_HASH_LENGTH]}.json.gz"
+    if not (output_dir / path).exists():
+        geometry.write_atomic(output_dir / path, gzip.compress(content, compresslevel=9, mtime=0))
+    return path
+
+
+def copy_assets(output_dir: pathlib.Path) -> None:
+    """Copy front end, plotly.js and geometry assets referenced by exported maps."""
+    for path in FRONTEND_DIR.iterdir():
+        shutil.copyfile(path, output_dir / path.name)
+    shutil.copyfile(PLOTLY_JS, output_dir / PLOTLY_JS.name)
+    (output_dir / GEOMETRY_DIR).mkdir(exist_ok=True)
+    for spatial_res in warmup.SPATIAL_RESOLUTIONS:
+        for url in data.get_regions_urls(spatial_res, warmup.MAP_HEIGHT):
+            name = url.removeprefix(geometry.ASSET_URL_PREFIX)
+            for suffix in ["", *geometry.ASSET_ENCODINGS.values()]:
+                source = settings.ASSETS_BUILD_DIR / (name + suffix)
+                if source.exists():
+                    shutil.copyfile(source, output_dir / GEOMETRY_DIR / source.name)
+
+
+def get_manifest(figures: dict[str, str], single_criteria: bool, app_url: str | None) -> dict:  # noqa: FBT001
+    """Return manifest of exported figures and the options of the front end."""
+    import app
+
+    registries = {spatial_res: regions.get_registry(spatial_res) for spatial_res in warmup.SPATIAL_RESOLUTIONS}
+    requirements = {}
+    for requirement in data.requirement_units:
+        unit_options, default_unit, _, _ = app.change_unit(requirement)
+        requirements[requirement] = {
+            "label": REQUIREMENT_LABELS[requirement],
+            "units": unit_options,
+            "default_unit": default_unit,
+            "criteria": list(get_criteria_sets(requirement, single_criteria)),
+        }
+    return {
+        "version": data.get_dataset_version(),
+        # dash app serving combinations not exported, e.g. multiple criteria or scenario comparison
+        "app_url": app_url,
+        "scenarios": [
+            {"label": data.get_sce_pretty_names()[short_name], "value": short_name}
+            for short_name in data.get_scenarios()
+        ],
+        "years": data.get_years(),
+        "spatial_resolutions": [
+            {"label": resolutions.get_resolution(name).label, "value": name} for name in warmup.SPATIAL_RESOLUTIONS
+        ],
+        "requirements": requirements,
+        # region codes are reused by resolutions for different areas
+        "regions": {
+            spatial_res: [
+                {"label": option, "value": registries[spatial_res].get_code(option)}
+                for option in registries[spatial_res].dropdown_options
+            ]
+            for spatial_res in warmup.SPATIAL_RESOLUTIONS
+        },
+        "default_region": regions.get_registry().get_code(warmup.DEFAULT_REGION),
+        "figures": figures,
+    }
+
+
+def export(
+    output_dir: pathlib.Path = settings.STATIC_BUILD_DIR,
+    workers: int = settings.WARMUP_WORKERS,
+    single_criteria: bool = False,  # noqa: FBT001, FBT002
+    app_url: str | None = None,
+) -> None:
+    """
+    Render figures of all common combinations in a process pool and write them with a manifest and the front end.
+
+    Figure files are named by content hash and never change, the manifest is written last
+    and points to the figures of the current data version.
+    """
+    start = time.perf_counter()
+    tasks = get_tasks(single_criteria)
+    (output_dir / FIGURES_DIR).mkdir(parents=True, exist_ok=True)
+    logging.info(f"Exporting {len(tasks)} figures to {output_dir} using {workers} workers.")
+    figures = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=warmup.init_worker) as executor:
+        paths = executor.map(
+            render,
+            [(name, kwargs, output_dir) for name, kwargs, _ in tasks.values()],
+            chunksize=16,
+        )
+        for (_, _, keys), path in zip(tasks.values(), paths):
+            figures.update(dict.fromkeys(keys, path))
+    copy_assets(output_dir)
+    manifest = get_manifest(figures, single_criteria, app_url)
+    geometry.write_atomic(output_dir / MANIFEST_FILENAME, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+    logging.info(
+        f"Exported {len(figures)} figures ({len(set(figures.values()))} files) in {time.perf_counter() - start:.1f} s.",
+    )
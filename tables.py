@@ -0,0 +1,83 @@
+"""Holds functionality to compile scenario tables into a memory-mappable columnar format."""
+import json
+import logging
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+import data
+import metrics
+import settings
+
+META_FILENAME = "meta.json"
+# version of columns written by compile_table, tables of other versions are outdated
+FORMAT_VERSION = 2
+
+
+def get_table_dir(path: pathlib.Path) -> pathlib.Path:
+    """Return directory of compiled table for given csv path."""
+    return settings.TABLES_BUILD_DIR / path.relative_to(settings.DATA_DIR).with_suffix("")
+
+
+def get_source_stamp(path: pathlib.Path) -> dict[str, int]:
+    """Return size and modification time of source file to detect outdated tables."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def compile_table(df: pd.DataFrame, path: pathlib.Path) -> pathlib.Path:
+    """
+    Write table compiled from csv at given path as one .npy file per column.
+
+    Categorical columns are stored as codes, their categories are kept in the meta file.
+    """
+    table_dir = get_table_dir(path)
+    table_dir.mkdir(parents=True, exist_ok=True)
+    columns = []
+    for name, column in df.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            np.save(table_dir / f"{name}.npy", column.cat.codes.to_numpy())
+            columns.append({"name": name, "categories": column.cat.categories.tolist()})
+        else:
+            np.save(table_dir / f"{name}.npy", column.to_numpy())
+            columns.append({"name": name})
+    meta = {"columns": columns, "source": get_source_stamp(path), "format": FORMAT_VERSION}
+    with (table_dir / META_FILENAME).open("w", encoding="utf-8") as metafile:
+        json.dump(meta, metafile)
+    return table_dir
+
+
+def load_table(path: pathlib.Path) -> pd.DataFrame | None:
+    """
+    Load compiled table of csv at given path, memory-mapping its columns.
+
+    Columns are read-only and shared between processes via the page cache.
+    Returns None if table is not compiled or outdated.
+    """
+    table_dir = get_table_dir(path)
+    try:
+        with (table_dir / META_FILENAME).open("r", encoding="utf-8") as metafile:
+            meta = json.load(metafile)
+    except FileNotFoundError:
+        return None
+    if meta["source"] != get_source_stamp(path) or meta.get("format") != FORMAT_VERSION:
+        logging.warning(f"Compiled table of {path.name} is outdated, falling back to csv.")
+        return None
+    metrics.registry.inc("rgi_data_loads_total", {"kind": "table"})
+    columns = {}
+    for column in meta["columns"]:
+        values = np.load(table_dir / f"{column['name']}.npy", mmap_mode="r")
+        if "categories" in column:
+            values = pd.Categorical.from_codes(values, categories=column["categories"])
+        columns[column["name"]] = values
+    # copy=False keeps columns memory-mapped instead of consolidating them
+    return pd.DataFrame(columns, copy=False)
+
+
+def compile_tables() -> None:
+    """Compile all scenario csv files in data directory, technology names already mapped."""
+    for path in sorted(settings.DATA_DIR.rglob("*_joined.csv")):
+        _, requirement = data.parse_table_name(path)
+        table_dir = compile_table(data.read_requirements(path, requirement), path)
+        logging.info(f"Compiled {path.relative_to(settings.DATA_DIR)} into {table_dir}.")
@@ -0,0 +1,6 @@
+"""Settings of test runs, applied before app modules are imported."""
+import os
+
+# settings require a secret key, figures are not cached on disk
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CACHE_DIR", "")
@@ -0,0 +1,32 @@
+"""Tests of benchmark callback requests."""
+import json
+
+import app
+import benchmark
+import data
+import regions
+
+
+def test_callbacks_are_requested_like_by_the_browser():
+    client = app.server.test_client()
+    dependencies = client.get(benchmark.DEPENDENCIES_URL).get_json()
+    bar_chart = benchmark.get_callback(client, dependencies, "region.figure")
+    body = bar_chart(
+        triggered="region_dd",
+        choropleth_1=None,
+        choropleth_2=None,
+        scenarios="scenario_single",
+        scenario="CLEVER",
+        scenario_1="CLEVER",
+        scenario_2="PAC2.0",
+        year=2050,
+        requirement="area",
+        unit="rel",
+        region_dd=regions.get_registry().get_dropdown_label("DE1 0"),
+        criteria=data.get_criteria("area"),
+        animate=False,
+        spatial_res="region",
+    )
+    figure = json.loads(body)["response"]["region"]["figure"]
+    assert {trace["name"] for trace in figure["data"]} <= set(data.get_criteria("area"))
+    assert figure["data"]
@@ -0,0 +1,67 @@
+"""Tests of the memory tier of the figure cache and its keys."""
+import pickle
+
+import caching
+
+VALUES = {key: key.encode() * 100 for key in "abcd"}
+SIZES = {key: len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)) for key, value in VALUES.items()}
+
+
+def get_cache(entries: int) -> caching.FigureCache:
+    """Return memory-only cache fitting given number of values."""
+    return caching.FigureCache(max_memory_bytes=entries * SIZES["a"], directory=None, disk_threshold=0)
+
+
+def test_lru_evicts_by_size():
+    cache = get_cache(3)
+    for key in "abc":
+        cache.set(key, VALUES[key])
+    # a is used again, thus b is the least recently used entry
+    assert cache.get("a") == (True, VALUES["a"])
+    cache.set("d", VALUES["d"])
+    assert cache.get("b") == (False, None)
+    assert list(cache._memory) == ["c", "a", "d"]
+    stats = cache.get_stats()
+    assert stats["memory_evictions"] == 1
+    assert stats["memory_bytes"] == SIZES["a"] + SIZES["c"] + SIZES["d"]
+
+
+def test_large_value_evicts_several_entries():
+    cache = get_cache(3)
+    for key in "abc":
+        cache.set(key, VALUES[key])
+    # pickled with the same overhead as the other values
+    large = b"x" * (2 * SIZES["a"] - (SIZES["a"] - len(VALUES["a"])))
+    assert len(pickle.dumps(large, protocol=pickle.HIGHEST_PROTOCOL)) == 2 * SIZES["a"]
+    cache.set("large", large)
+    assert list(cache._memory) == ["c", "large"]
+    assert cache.get_stats()["memory_evictions"] == 2
+    assert cache.get_stats()["memory_bytes"] == cache.max_memory_bytes
+
+
+def test_oversize_value_is_not_stored():
+    cache = get_cache(1)
+    cache.set("a", VALUES["a"])
+    cache.set("large", b"x" * (2 * SIZES["a"]))
+    assert cache.get("large") == (False, None)
+    assert cache.get("a") == (True, VALUES["a"])
+
+
+def test_replaced_value_is_accounted_once():
+    cache = get_cache(3)
+    cache.set("a", VALUES["a"])
+    cache.set("a", VALUES["a"])
+    assert cache.get_stats()["memory_bytes"] == SIZES["a"]
+
+
+def test_memoize_ignores_order_of_sets():
+    cache = get_cache(3)
+    calls = []
+
+    @cache.memoize(sets=("criteria",))
+    def get_figure(criteria: list[str]) -> list[str]:
+        calls.append(criteria)
+        return sorted(criteria)
+
+    assert get_figure(["PV", "Grid"]) == get_figure(["Grid", "PV"])
+    assert len(calls) == 1
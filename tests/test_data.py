@@ -0,0 +1,106 @@
+"""Tests of the data layer against plain pandas on the scenario csv files."""
+import functools
+
+import pandas as pd
+import pytest
+
+import data
+import settings
+
+# criteria subsets of each requirement, all criteria are added per test
+CRITERIA = {
+    "area": [["PV", "Onshore wind"], ["Nature-protected area"], ["Grid", "Offshore wind", "Urban & industrial area"]],
+    "water": [["Gas", "Hydro"], ["Hydrogen production"], ["Nuclear", "Lignite", "Hard coal", "Biomass"]],
+}
+CASES = [
+    (requirement, criteria)
+    for requirement, subsets in CRITERIA.items()
+    for criteria in [*subsets, data.get_criteria(requirement)]
+]
+
+
+@functools.cache
+def read_csv(scenario: str, requirement: str) -> pd.DataFrame:
+    """Return csv of scenario (by short name) with technology names mapped, shared between tests."""
+    df = pd.read_csv(settings.DATA_DIR / f"{scenario}_{requirement}_joined.csv")
+    return df.replace(data.tech_dicts[requirement])
+
+
+def prepare_data(scenario: str, requirement: str, year: int, criteria: list[str]) -> pd.DataFrame:
+    """Return rounded rows of given year and criteria having at least one field or pool."""
+    df = read_csv(data.sce_names[scenario], requirement)
+    df = df[(df["target_year"] == year) & df["type"].isin(criteria)].rename(columns={"bus": "name"})
+    df = df.round(data.round_dict_area if requirement == "area" else data.round_dict_water)
+    return df.loc[df["oly_field" if requirement == "area" else "oly_pool"] >= 1]
+
+
+@pytest.mark.parametrize(("requirement", "criteria"), CASES)
+def test_prepare_data(requirement: str, criteria: list[str]):
+    for scenario in data.get_sce_names():
+        for year in data.get_years():
+            expected = prepare_data(scenario, requirement, year, criteria)
+            result = data.prepare_data(scenario, requirement, year, criteria)
+            pd.testing.assert_frame_equal(
+                result[expected.columns].reset_index(drop=True),
+                expected.reset_index(drop=True),
+                check_dtype=False,
+            )
+
+
+def test_prepare_data_by_onshore_flag():
+    scenario = next(iter(data.get_sce_names()))
+    criteria = data.get_criteria("area")
+    year = data.get_years()[0]
+    df = data.prepare_data(scenario, "area", year, criteria)
+    for onshore in (True, False):
+        selected = data.prepare_data(scenario, "area", year, criteria, onshore=onshore)
+        pd.testing.assert_frame_equal(
+            selected.reset_index(drop=True),
+            df.loc[df["onshore"] == onshore].reset_index(drop=True),
+        )
+
+
+def get_min_max(requirement: str, criteria: list[str], spatial_res: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return min and max of onshore values summed per bus, year and scenario over buses of a resolution."""
+    df = pd.concat(read_csv(scenario, requirement) for scenario in data.SCENARIOS)
+    df = df[df["type"].isin(criteria) & df["onshore"]]
+    is_region = df["bus"].str.len() > 3
+    df = df[is_region if spatial_res == "region" else ~is_region & (df["bus"] != "EU")]
+    summed = df.groupby(["bus", "target_year", "sce_name"])[data.requirement_units[requirement]].sum().reset_index()
+    grouped = summed.drop(columns="bus").groupby(["sce_name", "target_year"])
+    return grouped.min().reset_index(), grouped.max().reset_index()
+
+
+@pytest.mark.parametrize(("requirement", "criteria"), CASES)
+@pytest.mark.parametrize("spatial_res", ["region", "country"])
+def test_min_max(requirement: str, criteria: list[str], spatial_res: str):
+    results = data.get_min_max(requirement, criteria, spatial_res)
+    for result, expected in zip(results, get_min_max(requirement, criteria, spatial_res)):
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize(("requirement", "criteria"), CASES)
+@pytest.mark.parametrize("region", ["DE1 0", "DE", "EU"])
+def test_region_requirements(requirement: str, criteria: list[str], region: str):
+    units = data.requirement_units[requirement]
+    for scenario in data.get_sce_names():
+        for year in data.get_years():
+            df = prepare_data(scenario, requirement, year, criteria)
+            df = df[(df["name"] == region) & df["onshore"]]
+            expected = df.groupby(data.REGION_GROUP_KEYS)[units].sum().reset_index()
+            result = data.get_region_requirements(scenario, requirement, year, criteria, region)
+            pd.testing.assert_frame_equal(
+                result[expected.columns].sort_values(data.REGION_GROUP_KEYS, ignore_index=True),
+                expected,
+                check_dtype=False,
+            )
+
+
+def test_region_requirements_of_all_years():
+    criteria = data.get_criteria("area")
+    result = data.get_region_requirements("CLEVER", "area", None, criteria, "DE")
+    expected = pd.concat(
+        data.get_region_requirements("CLEVER", "area", year, criteria, "DE") for year in data.get_years()
+    )
+    assert len(result) == len(expected)
+    assert result["area_km2"].sum() == pytest.approx(expected["area_km2"].sum())
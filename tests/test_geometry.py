@@ -0,0 +1,75 @@
+"""Tests of topology-preserving geometry simplification."""
+import json
+
+import geometry
+import settings
+
+# shared border of two squares, zigzagging below the simplification tolerance
+BORDER = [[1 + (0.001 if i % 2 else 0), i / 20] for i in range(21)]
+TOLERANCE = 0.01
+
+
+def get_polygon(coordinates: list) -> dict:
+    """Return feature collection of a single polygon."""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "properties": {}, "geometry": {"type": "Polygon", "coordinates": [coordinates]}},
+        ],
+    }
+
+
+def test_shared_borders_stay_identical():
+    filenames = geometry.GEOMETRY_GROUPS[0]
+    geojsons = []
+    for filename in filenames:
+        with (settings.DATA_DIR / filename).open("r", encoding="utf-8") as geojsonfile:
+            geojsons.append(json.load(geojsonfile))
+    rings = [geometry.quantize(ring) for geojson in geojsons for ring in geometry.get_rings(geojson)]
+    rings = [ring for ring in rings if len(ring) >= 4]  # noqa: PLR2004
+    simplified = [
+        ring
+        for geojson in geometry.simplify_geojsons(geojsons, geometry.get_tolerance(600))
+        for ring in geometry.get_rings(geojson)
+    ]
+    assert len(simplified) == len(rings)
+    # rings which would collapse are kept as they are
+    kept = [{tuple(point) for point in ring} for ring in simplified]
+    memberships = {}
+    for ring_id, ring in enumerate(rings):
+        if len(simplified[ring_id]) < len(ring):
+            for point in map(tuple, ring):
+                memberships.setdefault(point, set()).add(ring_id)
+    shared = {point: ring_ids for point, ring_ids in memberships.items() if len(ring_ids) > 1}
+    assert shared
+    # points of shared borders are kept in all or none of the rings sharing them
+    assert all(len({point in kept[ring_id] for ring_id in ring_ids}) == 1 for point, ring_ids in shared.items())
+
+
+def test_border_below_tolerance_is_straightened():
+    left = get_polygon([[0, 0], *BORDER, [0, 1], [0, 0]])
+    right = get_polygon([[1, 0], [2, 0], [2, 1], *BORDER[::-1]])
+    for simplified in geometry.simplify_geojsons([left, right], TOLERANCE):
+        ring = simplified["features"][0]["geometry"]["coordinates"][0]
+        assert {tuple(point) for point in ring if 0.5 < point[0] < 1.5} == {(1.0, 0.0), (1.0, 1.0)}  # noqa: PLR2004
+
+
+def test_rings_stay_closed():
+    (simplified,) = geometry.simplify_geojsons([get_polygon([[0, 0], *BORDER, [0, 1], [0, 0]])], TOLERANCE)
+    ring = simplified["features"][0]["geometry"]["coordinates"][0]
+    assert ring[0] == ring[-1]
+    assert len(ring) >= 4  # noqa: PLR2004
+
+
+def test_small_island_is_kept():
+    island = get_polygon([[5, 5], [5.001, 5], [5.001, 5.001], [5, 5.001], [5, 5]])
+    (simplified,) = geometry.simplify_geojsons([island], TOLERANCE)
+    assert len(simplified["features"][0]["geometry"]["coordinates"][0]) >= 4  # noqa: PLR2004
+
+
+def test_shared_border_is_split_at_its_ends_only():
+    left = geometry.quantize([[0, 0], *BORDER, [0, 1], [0, 0]])
+    right = geometry.quantize([[1, 0], [2, 0], [2, 1], *BORDER[::-1]])
+    nodes = geometry.get_nodes([left, right])
+    assert {(1.0, 0.0), (1.0, 1.0)} <= nodes
+    assert not nodes & {tuple(point) for point in BORDER[1:-1]}
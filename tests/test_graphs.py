@@ -0,0 +1,90 @@
+"""Tests of choropleth values and partial updates."""
+import numpy as np
+import pandas as pd
+import pytest
+from dash import Patch
+from plotly import graph_objects as go
+
+import app
+import data
+import graphs
+
+CRITERIA = {
+    "area": [["PV", "Onshore wind"], ["Nature-protected area", "Offshore wind"]],
+    "water": [["Gas", "Hydro"], ["Hydrogen production"]],
+}
+CASES = [
+    (requirement, criteria)
+    for requirement, subsets in CRITERIA.items()
+    for criteria in [*subsets, data.get_criteria(requirement)]
+]
+
+
+@pytest.mark.parametrize(("requirement", "criteria"), CASES)
+def test_map_frames(requirement: str, criteria: list[str]):
+    for unit in data.requirement_units[requirement]:
+        for year in data.get_years():
+            frames = graphs.get_map_frames("CLEVER", "region", requirement, year, unit)
+            df, df_offshore, columns = frames.select(criteria)
+            rows = data.prepare_data("CLEVER", requirement, year, criteria)
+
+            expected = rows[rows["onshore"]].groupby("name")[unit].sum()
+            assert df["name"].tolist() == expected.index.tolist()
+            assert np.allclose(df[unit], expected)
+
+            expected_offshore = pd.pivot_table(
+                rows[~rows["onshore"]], values=unit, index="name", columns="type", aggfunc="sum",
+            ).fillna(0)
+            assert df_offshore["name"].tolist() == expected_offshore.index.tolist()
+            for criterion, label in graphs.OFFSHORE_HOVER_TYPES.items():
+                column = f"{label} {graphs.OFFSHORE_HOVER_UNITS.get(unit)}"
+                assert (column in columns) == (column in df_offshore and criterion in expected_offshore)
+                if column in columns:
+                    assert np.allclose(df_offshore[column], expected_offshore[criterion])
+
+
+def get_update(geometry: list[str] | None, **kwargs) -> tuple[go.Figure | Patch, list[str] | None]:
+    """Return choropleth update of single scenario view for default settings updated by given ones."""
+    kwargs = {
+        "scenario": "CLEVER",
+        "spatial_res": "region",
+        "requirement": "area",
+        "year": 2050,
+        "unit": "rel",
+        "criteria": data.get_criteria("area"),
+        "height": 800,
+        "scenarios": "scenario_single",
+        "coloraxes": True,
+        **kwargs,
+    }
+    kwargs["min_max"] = app.get_min_max(
+        kwargs["requirement"], kwargs["criteria"], kwargs["scenarios"], kwargs["scenario"],
+        spatial_res=kwargs["spatial_res"],
+    )
+    return app.get_choropleth_update(geometry, False, **kwargs)  # noqa: FBT003
+
+
+def test_unit_change_is_patched():
+    fig, geometry = get_update(None)
+    assert isinstance(fig, go.Figure)
+    patch, patched_geometry = get_update(geometry, unit="area_km2")
+    assert isinstance(patch, Patch)
+    assert patched_geometry == geometry
+    # values are replaced by those of the full figure, geometry is kept on the client
+    full, _ = get_update(None, unit="area_km2")
+    values = {
+        tuple(operation["location"]): operation["params"]["value"]
+        for operation in patch.to_plotly_json()["operations"]
+    }
+    assert not any(location[-1] in graphs.GEOMETRY_PROPERTIES for location in values)
+    for i, trace in enumerate(full.data):
+        if getattr(trace, "z", None) is not None:
+            assert np.array_equal(np.asarray(values[("data", i, "z")]), np.asarray(trace.z))
+
+
+def test_resolution_change_is_full_figure():
+    _, geometry = get_update(None)
+    fig, new_geometry = get_update(geometry, spatial_res="region_106")
+    assert isinstance(fig, go.Figure)
+    assert new_geometry != geometry
+    assert any("106" in str(getattr(trace, "geojson", "")) for trace in fig.data)
@@ -0,0 +1,80 @@
+"""Tests of the region hierarchy and the rollup of region values."""
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data
+import hierarchy
+import regions
+import settings
+
+KEYS = ["sce_name", "target_year", "type"]
+
+
+def get_onshore_rows(requirement: str) -> pd.DataFrame:
+    """Return onshore rows of all scenarios of the default resolution."""
+    store = data.get_scenario_store()
+    return pd.concat(df.loc[df.onshore] for (_, name), df in store.items() if name == requirement)
+
+
+def test_levels():
+    region_hierarchy = hierarchy.get_hierarchy()
+    assert region_hierarchy.get_level(regions.EU) == hierarchy.EU_LEVEL
+    assert region_hierarchy.get_level("DE") == hierarchy.COUNTRY_LEVEL
+    assert region_hierarchy.get_level("DE1 0") == hierarchy.REGION_LEVEL
+    assert region_hierarchy.get_level("unknown") is None
+
+
+def test_groups_hold_regions_only():
+    region_hierarchy = hierarchy.get_hierarchy()
+    codes = ["DE1 0", "FR1 2", "DE", regions.EU]
+    assert region_hierarchy.get_groups(codes, hierarchy.COUNTRY_LEVEL) == {"DE1 0": "DE", "FR1 2": "FR"}
+    assert region_hierarchy.get_groups(codes, hierarchy.EU_LEVEL) == {"DE1 0": regions.EU, "FR1 2": regions.EU}
+
+
+@pytest.mark.parametrize("requirement", list(data.requirement_units))
+def test_rollup_equals_country_rows(requirement: str):
+    units = data.requirement_units[requirement]
+    df = get_onshore_rows(requirement)
+    region_hierarchy = hierarchy.get_hierarchy()
+    levels = region_hierarchy.get_levels(df["bus"])
+    region_df = df.loc[levels == hierarchy.REGION_LEVEL]
+    country_df = df.loc[levels == hierarchy.COUNTRY_LEVEL]
+    groups = region_hierarchy.get_groups(region_df["bus"].unique().tolist(), hierarchy.COUNTRY_LEVEL)
+
+    rolled = hierarchy.rollup(region_df, groups, KEYS, units).set_index([*KEYS, "bus"]).sort_index()
+    summed = [unit for unit in units if unit not in hierarchy.RATIO_UNITS]
+    # several types of the tables may map to the same type, their rows are summed
+    expected = country_df.groupby([*KEYS, "bus"], observed=True)[summed].sum().sort_index()
+    assert rolled.index.equals(expected.index)
+    assert np.allclose(rolled[summed], expected[summed], equal_nan=True)
+
+    for unit in units:
+        if unit in hierarchy.RATIO_UNITS:
+            # ratios are only comparable if the parts of all regions are known
+            denominator = hierarchy.RATIO_UNITS[unit][1]
+            grouped = region_df.assign(bus=region_df["bus"].map(groups)).groupby([*KEYS, "bus"], observed=True)
+            complete = ~grouped[denominator].apply(lambda parts: parts.isna().any())
+            index = complete.index[complete].intersection(rolled.index)
+            assert len(index)
+            expected_ratio = country_df.set_index([*KEYS, "bus"])[unit]
+            assert np.allclose(rolled.loc[index, unit], expected_ratio.loc[index], equal_nan=True)
+
+
+def test_missing_base_areas_are_recovered(tmp_path: pathlib.Path):
+    df = pd.read_csv(settings.DATA_DIR / "clever_area_joined.csv")
+    df.drop(columns="base_area").to_csv(tmp_path / "clever_area_joined.csv", index=False)
+    recovered = data.read_requirements(tmp_path / "clever_area_joined.csv", "area")["base_area"]
+    known = (df["rel"] > 0).to_numpy()
+    assert np.allclose(recovered[known], df["base_area"][known], rtol=1e-9)
+    assert recovered[~known].isna().all()
+
+
+def test_ratios_are_rolled_up_without_base_areas_in_tables():
+    grouped, ranges = data.get_region_index("CLEVER", "area", "region_106")
+    for region in ("DE", regions.EU):
+        rows = grouped.iloc[ranges[region]]
+        assert rows["rel"].notna().all()
+        assert (rows["rel"] <= 100).all()
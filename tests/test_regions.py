@@ -0,0 +1,60 @@
+"""Tests of region names per spatial resolution."""
+import json
+
+import numpy as np
+
+import graphs
+import regions
+import resolutions
+import settings
+
+# code of different areas in the 50 and 106 region clusterings
+CODE = "DE1 0"
+
+
+def get_center(filename: str, code: str) -> np.ndarray:
+    """Return mean of the outer ring points of a region in a geojson file."""
+    with (settings.DATA_DIR / filename).open("r", encoding="utf-8") as geojsonfile:
+        features = json.load(geojsonfile)["features"]
+    (feature,) = (feature for feature in features if feature["properties"]["name"] == code)
+    polygons = feature["geometry"]["coordinates"]
+    if feature["geometry"]["type"] == "Polygon":
+        polygons = [polygons]
+    return np.concatenate([np.array(polygon[0]) for polygon in polygons]).mean(axis=0)
+
+
+def test_code_names_different_areas():
+    centers = [get_center(resolutions.get_resolution(name).onshore_geojson, CODE) for name in ("region", "region_106")]
+    assert np.abs(centers[0] - centers[1]).max() > 1
+
+
+def test_names_depend_on_resolution():
+    registry = regions.get_registry("region")
+    registry_106 = regions.get_registry("region_106")
+    assert registry.get_pretty_name(CODE) == "Germany, Western Germany"
+    assert registry_106.get_pretty_name(CODE) == f"Germany, {CODE}"
+    # options name the regions of their resolution only
+    label = registry.get_dropdown_label(CODE)
+    assert label in registry.dropdown_options
+    assert label not in registry_106.dropdown_options
+    assert registry_106.get_code(registry_106.get_dropdown_label(CODE)) == CODE
+    # regions of the 106 clustering only are named too
+    assert registry_106.get_pretty_name("AT1 1") == "Austria, AT1 1"
+    assert registry_106.get_code("- Austria, AT1 1") == "AT1 1"
+
+
+def test_countries_and_eu_are_named_at_all_resolutions():
+    for spatial_res in resolutions.RESOLUTIONS:
+        registry = regions.get_registry(spatial_res)
+        assert registry.dropdown_options[0] == "European Union"
+        assert registry.get_code("European Union") == regions.EU
+        assert registry.get_code("Germany") == "DE"
+
+
+def test_hover_names_depend_on_resolution():
+    hover_names = {}
+    for spatial_res in ("region", "region_106"):
+        frames = graphs.get_map_frames("CLEVER", spatial_res, "area", 2050, "rel")
+        hover_names[spatial_res] = dict(zip(frames.onshore.names, frames.onshore.hover_names))
+    assert hover_names["region"][CODE].startswith("Germany, Western Germany")
+    assert hover_names["region_106"][CODE].startswith(f"Germany, {CODE}")
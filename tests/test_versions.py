@@ -0,0 +1,77 @@
+"""Tests of versioned caches and their pruning on data reloads."""
+import pathlib
+import types
+
+import pytest
+
+import settings
+import versions
+
+
+def get_version(**fingerprints: str) -> versions.DataVersion:
+    """Return version of given fingerprints by file name."""
+    stamps = {name: (0, 0) for name in fingerprints}
+    return versions.DataVersion(types.MappingProxyType(fingerprints), types.MappingProxyType(stamps))
+
+
+@pytest.fixture()
+def calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Isolate versioned caches and return calls of a cached function."""
+    monkeypatch.setattr(versions, "_caches", [])
+    monkeypatch.setattr(versions, "_invalidators", [])
+    monkeypatch.setattr(versions, "_active", get_version(a="1", b="1"))
+    return []
+
+
+def get_cached(calls: list[str]):  # noqa: ANN201
+    """Return cached function deriving from the file named by its argument."""
+
+    @versions.cache(files=lambda name: [name])
+    def load(name: str) -> str:
+        calls.append(name)
+        return f"{name}{versions.get_version().fingerprints.get(name)}"
+
+    return load
+
+
+def test_results_are_cached(calls: list[str]):
+    load = get_cached(calls)
+    assert load("a") == load("a") == "a1"
+    assert calls == ["a"]
+
+
+def test_prune_drops_changed_files_only(calls: list[str]):
+    load = get_cached(calls)
+    load("a")
+    load("b")
+    version = get_version(a="1", b="2")
+    assert versions.prune(version) == 1
+    (results,) = versions._caches
+    assert [key[0] for key in results] == [("a",)]
+    versions._active = version
+    assert load("a") == "a1"
+    assert load("b") == "b2"
+    assert calls == ["a", "b", "b"]
+
+
+def test_reload_swaps_in_changed_files(calls: list[str], monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    (tmp_path / "a.csv").write_text("1")
+    (tmp_path / "b.csv").write_text("1")
+    monkeypatch.setattr(versions, "_active", versions.scan())
+    load = get_cached(calls)
+    load("a.csv")
+    load("b.csv")
+    outdated = []
+    versions.add_invalidator(outdated.extend)
+    fingerprint = versions.get_version().fingerprints["b.csv"]
+
+    # size changes too, modification times may be too coarse to tell the writes apart
+    (tmp_path / "b.csv").write_text("22")
+    assert versions.reload(lambda: load("b.csv")) == {"b.csv"}
+    assert outdated == [fingerprint]
+    assert calls == ["a.csv", "b.csv", "b.csv"]
+    load("a.csv")
+    load("b.csv")
+    assert calls == ["a.csv", "b.csv", "b.csv"]
+    assert versions.reload(lambda: None) == set()
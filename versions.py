@@ -0,0 +1,185 @@
+"""Holds content fingerprints of data files and hot reload of structures derived from them."""
+import contextvars
+import dataclasses
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+import types
+from collections.abc import Callable, Iterable, Mapping
+
+import settings
+
+# data files watched for changes, relative to the data directory
+WATCHED_PATTERNS = ("*.csv", "*.geojson")
+FINGERPRINT_LENGTH = 16
+# bytes read at once while hashing data files
+READ_CHUNK_BYTES = 1024**2
+
+
+@dataclasses.dataclass(frozen=True)
+class DataVersion:
+    """Content fingerprints of data files by name relative to the data directory."""
+
+    fingerprints: Mapping[str, str]
+    # size and modification time per file, unchanged files are not hashed again on rescan
+    stamps: Mapping[str, tuple[int, int]]
+
+    def get_sources(self, names: Iterable[str]) -> tuple[tuple[str, str | None], ...]:
+        """Return names with their fingerprints, None for missing files."""
+        return tuple((name, self.fingerprints.get(name)) for name in names)
+
+    def get_digest(self, names: Iterable[str]) -> str:
+        """Return combined fingerprint of given files."""
+        key = json.dumps(self.get_sources(sorted(names)))
+        return hashlib.sha256(key.encode()).hexdigest()[:FINGERPRINT_LENGTH]
+
+    def get_changed(self, other: "DataVersion") -> set[str]:
+        """Return names of files added, removed or changed in other version."""
+        names = self.fingerprints.keys() | other.fingerprints.keys()
+        return {name for name in names if self.fingerprints.get(name) != other.fingerprints.get(name)}
+
+
+def get_fingerprint(path: object) -> str:
+    """Return fingerprint of file content."""
+    digest = hashlib.sha256()
+    with path.open("rb") as datafile:
+        while chunk := datafile.read(READ_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def scan(previous: DataVersion | None = None) -> DataVersion:
+    """Fingerprint watched data files, reusing fingerprints of previous version for unchanged files."""
+    fingerprints = {}
+    stamps = {}
+    for pattern in WATCHED_PATTERNS:
+        for path in sorted(settings.DATA_DIR.rglob(pattern)):
+            name = str(path.relative_to(settings.DATA_DIR))
+            stat = path.stat()
+            stamps[name] = (stat.st_size, stat.st_mtime_ns)
+            if previous is not None and previous.stamps.get(name) == stamps[name]:
+                fingerprints[name] = previous.fingerprints[name]
+            else:
+                fingerprints[name] = get_fingerprint(path)
+    return DataVersion(types.MappingProxyType(fingerprints), types.MappingProxyType(stamps))
+
+
+# version served to requests, replaced as a whole once a reload is built
+_active = None
+# version being built by a reload, only visible to the reloading thread
+_building = contextvars.ContextVar("building", default=None)
+_lock = threading.Lock()
+# results of versioned caches, pruned from outdated entries on reload
+_caches = []
+# callbacks called with outdated fingerprints after a reload, e.g. to discard figures
+_invalidators = []
+
+
+def get_version() -> DataVersion:
+    """Return version being built by the current thread, otherwise the active one."""
+    global _active  # noqa: PLW0603
+    building = _building.get()
+    if building is not None:
+        return building
+    if _active is None:
+        with _lock:
+            if _active is None:
+                _active = scan()
+    return _active
+
+
+def cache(files: Callable[..., Iterable[str]]) -> Callable:
+    """
+    Cache results like functools.cache, keyed by arguments and fingerprints of the data files they derive from.
+
+    Files are returned by given function called with the same arguments, relative to the data directory.
+    Results of changed files are never returned again and are removed once their reload is swapped in.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        results = {}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> object:  # noqa: ANN002
+            key = (args, tuple(kwargs.items()), get_version().get_sources(files(*args, **kwargs)))
+            if key not in results:
+                results[key] = func(*args, **kwargs)
+            return results[key]
+
+        wrapper.cache_clear = results.clear
+        _caches.append(results)
+        return wrapper
+
+    return decorator
+
+
+def add_invalidator(invalidator: Callable[[set[str]], None]) -> None:
+    """Add function called with fingerprints of changed files after a reload is swapped in."""
+    _invalidators.append(invalidator)
+
+
+def prune(version: DataVersion) -> int:
+    """Remove cached results derived from files whose fingerprints differ in given version."""
+    removed = 0
+    for results in _caches:
+        for key in list(results):
+            if any(version.fingerprints.get(name) != fingerprint for name, fingerprint in key[2]):
+                results.pop(key, None)
+                removed += 1
+    return removed
+
+
+def reload(rebuild: Callable[[], None]) -> set[str]:
+    """
+    Rescan data files and, if any changed, build and swap in structures of the new version.
+
+    Structures are rebuilt by given function in this thread, while requests keep being served
+    from the active version. Unchanged files keep their fingerprints, so their results are reused.
+    Returns names of changed files.
+    """
+    global _active  # noqa: PLW0603
+    import metrics
+
+    active = get_version()
+    version = scan(active)
+    changed = active.get_changed(version)
+    if not changed:
+        return changed
+    start = time.perf_counter()
+    token = _building.set(version)
+    try:
+        rebuild()
+    finally:
+        _building.reset(token)
+    # single assignment, requests see either the old or the new version
+    _active = version
+    removed = prune(version)
+    outdated = {active.fingerprints[name] for name in changed if name in active.fingerprints}
+    for invalidator in _invalidators:
+        invalidator(outdated)
+    metrics.registry.inc("rgi_data_reloads_total")
+    logging.info(
+        f"Reloaded data in {time.perf_counter() - start:.2f} s after changes of {', '.join(sorted(changed))}, "
+        f"{removed} cached results removed.",
+    )
+    return changed
+
+
+def watch(rebuild: Callable[[], None], interval: float = settings.DATA_WATCH_INTERVAL) -> threading.Thread:
+    """Start daemon thread polling data files every interval (in s) and reloading them on change."""
+
+    def poll() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                reload(rebuild)
+            except Exception:
+                # keep serving the active version, e.g. if a file was read while being written
+                logging.exception("Reloading data failed.")
+
+    thread = threading.Thread(target=poll, name="data-watcher", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,99 @@
+"""Holds functionality to pre-render common figures into the figure cache."""
+import concurrent.futures
+import logging
+import time
+
+import data
+import graphs
+import regions
+import settings
+from caching import figure_cache
+
+# unit selected by default for each requirement
+DEFAULT_UNITS = {"area": "rel", "water": "water_miom3"}
+SPATIAL_RESOLUTIONS = ["region", "country"]
+DEFAULT_REGION = "European Union"
+MAP_HEIGHT = 800
+
+
+def get_tasks() -> list[tuple[str, dict]]:
+    """
+    Return figures shown in single scenario view with default criteria.
+
+    Tasks are tuples of graphs function name and its arguments, starting with the default view.
+    """
+    import app
+
+    region = regions.get_registry().get_code(DEFAULT_REGION)
+    tasks = []
+    for requirement, default_unit in DEFAULT_UNITS.items():
+        criteria = data.get_criteria(requirement)
+        units = [default_unit] + [unit for unit in data.requirement_units[requirement] if unit != default_unit]
+        for scenario in data.get_sce_names():
+            for year in data.get_years():
+                for spatial_res in SPATIAL_RESOLUTIONS:
+                    min_max = app.get_min_max(
+                        requirement, criteria, "scenario_single", scenario, spatial_res=spatial_res,
+                    )
+                    tasks.extend(
+                        (
+                            "get_choropleth_values",
+                            {
+                                "scenario": scenario,
+                                "spatial_res": spatial_res,
+                                "requirement": requirement,
+                                "year": year,
+                                "unit": unit,
+                                "criteria": criteria,
+                                "min_max": min_max,
+                                "height": MAP_HEIGHT,
+                                "scenarios": "scenario_single",
+                                "coloraxes": True,
+                            },
+                        )
+                        for unit in units
+                    )
+                tasks.extend(
+                    (
+                        "get_bar_chart",
+                        {
+                            "scenarios": [scenario],
+                            "requirement": requirement,
+                            "year": year,
+                            "unit": unit,
+                            "criteria": criteria,
+                            "region": region,
+                        },
+                    )
+                    for unit in units
+                )
+    return tasks
+
+
+def init_worker() -> None:
+    """Collect rendered figures in memory only, they are stored by the parent process."""
+    figure_cache.disable_disk()
+    figure_cache.pop_memory_entries()
+
+
+def render(task: tuple[str, dict]) -> list[tuple[str, object]]:
+    """Render figure of task and return all cache entries created for it."""
+    name, kwargs = task
+    getattr(graphs, name)(**kwargs)
+    return figure_cache.pop_memory_entries()
+
+
+def warm_up(workers: int = settings.WARMUP_WORKERS) -> None:
+    """Render figures of all tasks not cached yet in a process pool and store them in the figure cache."""
+    start = time.perf_counter()
+    tasks = [
+        (name, kwargs)
+        for name, kwargs in get_tasks()
+        if not figure_cache.has(getattr(graphs, name).get_key(**kwargs))
+    ]
+    logging.info(f"Warming up figure cache with {len(tasks)} figures using {workers} workers.")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        for entries in executor.map(render, tasks):
+            for key, value in entries:
+                figure_cache.set(key, value)
+    logging.info(f"Warmed up figure cache in {time.perf_counter() - start:.1f} s.")
@@ -1,6 +1,13 @@
 """Used by unicorn to start dash app."""
 
-from app import server as application
+import settings
+
+if settings.PRELOAD:
+    import preload
+
+    preload.preload()
+
+from app import server as application  # noqa: E402
 
 if __name__ == "__main__":
     application.run()